@@ -1,16 +1,32 @@
+import asyncio
+from collections import OrderedDict
 from board import Board
+from change_feed import WORKSPACE, Change, on_loop
 from data_store import DataStore
+from debouncer import Debouncer
 import flet as ft
+from models import BoardModel
+from render_batch import RenderBatch, batched
 from sidebar import Sidebar
 
+SEARCH_HIT_LABELS = {"board": "Board", "list": "List", "item": "Card"}
+
 
 class AppLayout(ft.Row):
+    search_limit = 20
+    # Board views are built on first visit and the least recently used ones
+    # are dropped beyond this many, so memory doesn't grow with board count.
+    max_board_views = 8
+
     def __init__(self, app, page: ft.Page, store: DataStore, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.app = app
         self.page: ft.Page = page
         self.page.on_resized = self.page_resize
+        self.page.on_close = self.page_close
+        self.render_batch = RenderBatch(self.page)
         self.store: DataStore = store
+        self.board_views: OrderedDict[int, Board] = OrderedDict()
         self.toggle_nav_rail_button = ft.IconButton(
             icon = ft.Icons.ARROW_CIRCLE_LEFT,
             icon_color = ft.Colors.GREY_400,
@@ -20,6 +36,23 @@ class AppLayout(ft.Row):
         )
         self.sidebar = Sidebar(self, self.store)
         self.members_view = ft.Text("members view")
+        self.search_debouncer = Debouncer(self.page.loop, Board.search_delay, self.run_search)
+        self.search_field = ft.TextField(
+            hint_text = "Search all boards",
+            autofocus = False,
+            content_padding = ft.padding.only(left=10),
+            width = 200,
+            height = 40,
+            text_size = 12,
+            border_color = ft.Colors.BLACK26,
+            focused_border_color = ft.Colors.GREY,
+            suffix_icon = ft.Icons.SEARCH,
+            on_change = self.search_all_boards,
+        )
+        self.search_results = ft.Column([], spacing = 0, visible = False)
+        self.board_tiles: dict[int, ft.Container] = {}
+        self.board_grid = ft.Row([], wrap = True)
+        self.no_boards_row = ft.Row([ft.Text("No Boards to Display")])
         self.all_boards_view = ft.Column(
             [
                 ft.Row(
@@ -53,60 +86,102 @@ class AppLayout(ft.Row):
                         ),
                     ]
                 ),
-                ft.Row(
-                    [
-                        ft.TextField(
-                            hint_text = "Search all boards",
-                            autofocus = False,
-                            content_padding = ft.padding.only(left=10),
-                            width = 200,
-                            height = 40,
-                            text_size = 12,
-                            border_color = ft.Colors.BLACK26,
-                            focused_border_color = ft.Colors.GREY,
-                            suffix_icon = ft.Icons.SEARCH,
-                        )
-                    ]
-                ),
-                ft.Row([ft.Text("No Boards to Display")]),
+                ft.Row([self.search_field]),
+                self.search_results,
+                self.no_boards_row,
             ],
             expand=True,
         )
         self._active_view: ft.Control = self.all_boards_view
+        # Held while a change from another session is applied, so changes
+        # that wait on the store are still applied in order.
+        self.workspace_lock = asyncio.Lock()
+        self.subscription = self.store.subscribe(
+            WORKSPACE, on_loop(self.page.loop, self.workspace_change)
+        )
 
         self.controls = [self.sidebar, self.toggle_nav_rail_button, self.active_view]
 
+    def batch(self):
+        return self.render_batch.batch()
+
     @property
     def active_view(self):
         return self._active_view
 
     @active_view.setter
     def active_view(self, view):
+        self.show_view(view)
+
+    def show_view(self, view, boards: list[BoardModel] | None = None):
         self._active_view = view
         self.controls[-1] = self._active_view
-        self.sidebar.sync_board_destinations()
+        self.sidebar.sync_board_destinations(boards)
         self.page.update()
 
-    def set_board_view(self, i):
-        self.active_view = self.store.get_boards()[i]
-        self.sidebar.bottom_nav_rail.selected_index = i
+    def get_board_view(self, board: BoardModel) -> Board:
+        view = self.board_views.get(board.board_id)
+        if view is not None:
+            self.board_views.move_to_end(board.board_id)
+            return view
+        view = Board(self.app, self.store, board, self.page)
+        self.board_views[board.board_id] = view
+        while len(self.board_views) > self.max_board_views:
+            self.drop_board_view(next(iter(self.board_views)))
+        return view
+
+    def drop_board_view(self, board_id: int):
+        view = self.board_views.pop(board_id, None)
+        if view is not None:
+            view.dispose()
+
+    def page_close(self, e = None):
+        # The session is gone; stop receiving changes for it.
+        self.store.unsubscribe(self.subscription)
+        for board_id in list(self.board_views):
+            self.drop_board_view(board_id)
+
+    @batched
+    async def workspace_change(self, change: Change):
+        if change.origin is self.store:
+            return
+        async with self.workspace_lock:
+            boards = await self.app.async_store.get_boards()
+            if change.action == "remove":
+                showing = (
+                    type(self.active_view) is Board and self.active_view.board_id == change.id
+                )
+                self.drop_board_view(change.id)
+                if showing:
+                    self.set_all_boards_view(boards)
+                    return
+            self.hydrate_all_boards_view(boards)
+            self.page.update()
+
+    @batched
+    def set_board_view(self, board_id: int):
+        self.active_view = self.get_board_view(self.store.get_board(board_id))
+        self.sidebar.bottom_nav_rail.selected_index = self.sidebar.index_of(board_id)
         self.sidebar.top_nav_rail.selected_index = None
         self.page_resize()
         self.page.update()
 
-    def set_all_boards_view(self):
-        self.active_view = self.all_boards_view
-        self.hydrate_all_boards_view()
+    @batched
+    def set_all_boards_view(self, boards: list[BoardModel] | None = None):
+        self.show_view(self.all_boards_view, boards)
+        self.hydrate_all_boards_view(boards)
         self.sidebar.top_nav_rail.selected_index = 0
         self.sidebar.bottom_nav_rail.selected_index = None
         self.page.update()
 
+    @batched
     def set_members_view(self):
         self.active_view = self.members_view
         self.sidebar.top_nav_rail.selected_index = 1
         self.sidebar.bottom_nav_rail.selected_index = None
         self.page.update()
 
+    @batched
     def page_resize(self, e = None):
         if type(self.active_view) is Board:
             self.active_view.resize(
@@ -114,62 +189,103 @@ class AppLayout(ft.Row):
             )
         self.page.update()
 
-    def hydrate_all_boards_view(self):
-        self.all_boards_view.controls[-1] = ft.Row(
-            [
-                ft.Container(
-                    content = ft.Row(
-                        [
-                            ft.Container(
-                                content = ft.Text(value = b.name),
-                                data = b,
-                                expand = True,
-                                on_click = self.board_click,
-                            ),
-                            ft.Container(
-                                content = ft.PopupMenuButton(
-                                    items = [
-                                        ft.PopupMenuItem(
-                                            content = ft.Text(
-                                                value = "Delete",
-                                                theme_style = ft.TextThemeStyle.LABEL_MEDIUM,
-                                                text_align = ft.TextAlign.CENTER,
-                                            ),
-                                            on_click = self.app.delete_board,
-                                            data = b,
-                                        ),
-                                        ft.PopupMenuItem(),
-                                        ft.PopupMenuItem(
-                                            content = ft.Text(
-                                                value = "Archive",
-                                                theme_style = ft.TextThemeStyle.LABEL_MEDIUM,
-                                                text_align = ft.TextAlign.CENTER,
-                                            ),
-                                        ),
-                                    ]
+    def hydrate_all_boards_view(self, boards: list[BoardModel] | None = None):
+        # Tiles are keyed by board id and reused; only new boards get a tile
+        # built and only renamed ones are patched.
+        tiles = {}
+        for b in self.store.get_boards() if boards is None else boards:
+            tile = self.board_tiles.get(b.board_id)
+            if tile is None:
+                tile = self.board_tile(b)
+            elif b.name != tile.content.controls[0].content.value:
+                tile.content.controls[0].content.value = b.name
+            tiles[b.board_id] = tile
+        if tiles.keys() != self.board_tiles.keys():
+            self.board_grid.controls = list(tiles.values())
+        self.board_tiles = tiles
+        self.all_boards_view.controls[-1] = (
+            self.board_grid if tiles else self.no_boards_row
+        )
+        self.sidebar.sync_board_destinations(boards)
+
+    def board_tile(self, b: BoardModel):
+        return ft.Container(
+            content = ft.Row(
+                [
+                    ft.Container(
+                        content = ft.Text(value = b.name),
+                        data = b,
+                        expand = True,
+                        on_click = self.board_click,
+                    ),
+                    ft.Container(
+                        content = ft.PopupMenuButton(
+                            items = [
+                                ft.PopupMenuItem(
+                                    content = ft.Text(
+                                        value = "Delete",
+                                        theme_style = ft.TextThemeStyle.LABEL_MEDIUM,
+                                        text_align = ft.TextAlign.CENTER,
+                                    ),
+                                    on_click = self.app.delete_board,
+                                    data = b,
                                 ),
-                                padding = ft.padding.only(right = -10),
-                                border_radius = ft.border_radius.all(3),
-                            ),
-                        ],
-                        alignment = ft.MainAxisAlignment.SPACE_BETWEEN,
+                                ft.PopupMenuItem(),
+                                ft.PopupMenuItem(
+                                    content = ft.Text(
+                                        value = "Archive",
+                                        theme_style = ft.TextThemeStyle.LABEL_MEDIUM,
+                                        text_align = ft.TextAlign.CENTER,
+                                    ),
+                                ),
+                            ]
+                        ),
+                        padding = ft.padding.only(right = -10),
+                        border_radius = ft.border_radius.all(3),
                     ),
-                    border = ft.border.all(1, ft.Colors.BLACK38),
-                    border_radius = ft.border_radius.all(5),
-                    bgcolor = ft.Colors.WHITE60,
-                    padding = ft.padding.all(10),
-                    width = 250,
-                    data = b,
-                )
-                for b in self.store.get_boards()
-            ],
-            wrap = True,
+                ],
+                alignment = ft.MainAxisAlignment.SPACE_BETWEEN,
+            ),
+            border = ft.border.all(1, ft.Colors.BLACK38),
+            border_radius = ft.border_radius.all(5),
+            bgcolor = ft.Colors.with_opacity(0.6, ft.Colors.SURFACE),
+            padding = ft.padding.all(10),
+            width = 250,
+            data = b,
         )
-        self.sidebar.sync_board_destinations()
+
+    def search_all_boards(self, e):
+        self.search_debouncer()
+
+    @batched
+    async def run_search(self, generation: int):
+        query = self.search_field.value.strip()
+        hits = await self.app.async_store.search(query, self.search_limit) if query else []
+        if not self.search_debouncer.is_current(generation):
+            return
+        results = []
+        for hit in hits:
+            board = await self.app.async_store.get_board(hit.board_id)
+            label = SEARCH_HIT_LABELS[hit.kind]
+            results.append(
+                ft.ListTile(
+                    title = ft.Text(hit.text),
+                    subtitle = ft.Text(
+                        label if hit.kind == "board" else f"{label} in {board.name}"
+                    ),
+                    dense = True,
+                    data = board,
+                    on_click = self.board_click,
+                )
+            )
+        self.search_results.controls = results
+        self.search_results.visible = bool(results)
+        self.page.update()
 
     def board_click(self, e):
-        self.sidebar.bottom_nav_change(self.store.get_boards().index(e.control.data))
+        self.sidebar.open_board(e.control.data.board_id)
 
+    @batched
     def toggle_nav_rail(self, e):
         self.sidebar.visible = not self.sidebar.visible
         self.toggle_nav_rail_button.selected = not self.toggle_nav_rail_button.selected
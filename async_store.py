@@ -0,0 +1,187 @@
+import asyncio
+from typing import TYPE_CHECKING
+
+from data_store import DataStore
+
+if TYPE_CHECKING:
+    from models import BoardModel, BoardListModel, ItemModel
+    from search_index import SearchHit
+    from user import User
+
+
+class AsyncDataStore:
+    """Coroutine counterpart of DataStore for handlers on the event loop.
+
+    `async def` handlers run on the session's event loop, so they must not
+    wait on a slow store directly; they await these methods instead. Change
+    subscriptions stay on the DataStore, since registering a callback does
+    no I/O.
+    """
+
+    async def add_board(self, model) -> None:
+        raise NotImplementedError
+
+    async def get_board(self, id) -> "BoardModel":
+        raise NotImplementedError
+
+    async def get_boards(self) -> list["BoardModel"]:
+        raise NotImplementedError
+
+    async def update_board(self, model, update):
+        raise NotImplementedError
+
+    async def remove_board(self, board) -> None:
+        raise NotImplementedError
+
+    async def add_user(self, model) -> None:
+        raise NotImplementedError
+
+    async def get_users(self) -> list["User"]:
+        raise NotImplementedError
+
+    async def get_user(self, id) -> "User":
+        raise NotImplementedError
+
+    async def remove_user(self, id) -> None:
+        raise NotImplementedError
+
+    async def add_list(self, board, model) -> None:
+        raise NotImplementedError
+
+    async def get_lists(self) -> list["BoardListModel"]:
+        raise NotImplementedError
+
+    async def get_list(self, id) -> "BoardListModel":
+        raise NotImplementedError
+
+    async def get_lists_by_board(self, board) -> list["BoardListModel"]:
+        raise NotImplementedError
+
+    async def update_list(self, model, update):
+        raise NotImplementedError
+
+    async def remove_list(self, board, id) -> None:
+        raise NotImplementedError
+
+    async def add_item(self, board_list, model) -> None:
+        raise NotImplementedError
+
+    async def get_items(self, board_list) -> list["ItemModel"]:
+        raise NotImplementedError
+
+    async def get_item(self, id) -> "ItemModel":
+        raise NotImplementedError
+
+    async def get_items_by_board(self, board) -> list["ItemModel"]:
+        raise NotImplementedError
+
+    async def update_item(self, model, update):
+        raise NotImplementedError
+
+    async def move_item(self, item_id, to_list, index) -> None:
+        raise NotImplementedError
+
+    async def remove_item(self, board_list, id) -> None:
+        raise NotImplementedError
+
+    async def add_many(self, boards, lists, items) -> None:
+        raise NotImplementedError
+
+    async def next_id(self, kind) -> int:
+        return (await self.reserve_ids(kind, 1))[0]
+
+    async def reserve_ids(self, kind, count) -> range:
+        raise NotImplementedError
+
+    async def search(self, query, limit) -> list["SearchHit"]:
+        raise NotImplementedError
+
+
+class ThreadedStore(AsyncDataStore):
+    """AsyncDataStore over a blocking DataStore.
+
+    Each call runs on a worker thread, so the event loop keeps serving other
+    sessions while it waits. `inner` must be safe to call from several
+    threads at once, as SharedStore is.
+    """
+
+    def __init__(self, inner: DataStore):
+        self.inner = inner
+
+    async def add_board(self, model):
+        await asyncio.to_thread(self.inner.add_board, model)
+
+    async def get_board(self, id):
+        return await asyncio.to_thread(self.inner.get_board, id)
+
+    async def get_boards(self):
+        return await asyncio.to_thread(self.inner.get_boards)
+
+    async def update_board(self, model, update):
+        await asyncio.to_thread(self.inner.update_board, model, update)
+
+    async def remove_board(self, board):
+        await asyncio.to_thread(self.inner.remove_board, board)
+
+    async def add_user(self, model):
+        await asyncio.to_thread(self.inner.add_user, model)
+
+    async def get_users(self):
+        return await asyncio.to_thread(self.inner.get_users)
+
+    async def get_user(self, id):
+        return await asyncio.to_thread(self.inner.get_user, id)
+
+    async def remove_user(self, id):
+        await asyncio.to_thread(self.inner.remove_user, id)
+
+    async def add_list(self, board, model):
+        await asyncio.to_thread(self.inner.add_list, board, model)
+
+    async def get_lists(self):
+        return await asyncio.to_thread(self.inner.get_lists)
+
+    async def get_list(self, id):
+        return await asyncio.to_thread(self.inner.get_list, id)
+
+    async def get_lists_by_board(self, board):
+        return await asyncio.to_thread(self.inner.get_lists_by_board, board)
+
+    async def update_list(self, model, update):
+        await asyncio.to_thread(self.inner.update_list, model, update)
+
+    async def remove_list(self, board, id):
+        await asyncio.to_thread(self.inner.remove_list, board, id)
+
+    async def add_item(self, board_list, model):
+        await asyncio.to_thread(self.inner.add_item, board_list, model)
+
+    async def get_items(self, board_list):
+        return await asyncio.to_thread(self.inner.get_items, board_list)
+
+    async def get_item(self, id):
+        return await asyncio.to_thread(self.inner.get_item, id)
+
+    async def get_items_by_board(self, board):
+        return await asyncio.to_thread(self.inner.get_items_by_board, board)
+
+    async def update_item(self, model, update):
+        await asyncio.to_thread(self.inner.update_item, model, update)
+
+    async def move_item(self, item_id, to_list, index):
+        await asyncio.to_thread(self.inner.move_item, item_id, to_list, index)
+
+    async def remove_item(self, board_list, id):
+        await asyncio.to_thread(self.inner.remove_item, board_list, id)
+
+    async def add_many(self, boards, lists, items):
+        await asyncio.to_thread(self.inner.add_many, boards, lists, items)
+
+    async def next_id(self, kind):
+        return await asyncio.to_thread(self.inner.next_id, kind)
+
+    async def reserve_ids(self, kind, count):
+        return await asyncio.to_thread(self.inner.reserve_ids, kind, count)
+
+    async def search(self, query, limit = 10):
+        return await asyncio.to_thread(self.inner.search, query, limit)
@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+import flet as ft
+from flet.core.local_connection import LocalConnection
+from flet.core.protocol import (
+    ClientActions,
+    ClientMessage,
+    CommandEncoder,
+    PageCommandResponsePayload,
+    PageCommandsBatchResponsePayload,
+)
+
+
+class HeadlessConnection(LocalConnection):
+    """Connection that answers a page's commands without a Flet client.
+
+    Commands go through the same processing a real server does, so control
+    ids are assigned and the resulting client messages are serialized; the
+    messages are then dropped after their size is counted.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.messages = 0
+        self.bytes_sent = 0
+
+    def send(self, message: ClientMessage):
+        self.messages += 1
+        self.bytes_sent += len(
+            json.dumps(message, cls = CommandEncoder, separators = (",", ":"))
+        )
+
+    def send_command(self, session_id: str, command):
+        result, message = self._process_command(command)
+        if message:
+            self.send(message)
+        return PageCommandResponsePayload(result = result, error = "")
+
+    def send_commands(self, session_id: str, commands):
+        # Mirrors the socket server: one batch message per update, and a
+        # result only for the commands that produce one.
+        results = []
+        messages = []
+        for command in commands:
+            result, message = self._process_command(command)
+            if command.name in ["add", "get"]:
+                results.append(result)
+            if message:
+                messages.append(message)
+        if messages:
+            self.send(ClientMessage(ClientActions.PAGE_CONTROLS_BATCH, messages))
+        return PageCommandsBatchResponsePayload(results = results, error = "")
+
+
+def headless_page(width: int = 1280, height: int = 800) -> ft.Page:
+    page = ft.Page(HeadlessConnection(), "headless", asyncio.new_event_loop())
+    page._set_attr("width", width, False)
+    page._set_attr("height", height, False)
+    page._set_attr("route", "/", False)
+    return page
@@ -0,0 +1,346 @@
+"""Benchmarks for the store and the UI-model hot paths.
+
+Runs headless: the views are mounted on a real Flet page whose connection
+processes and serializes every update without a client (see headless.py).
+
+    python -m benchmarks.run --boards 20 --lists 5 --cards 200 > after.json
+    python -m benchmarks.run --compare before.json
+
+Each benchmark reports ops/sec, p50/p99 latency and the peak traced memory
+of its setup plus operations. UI benchmarks include the page update the app
+sends after the call, and report the average update size in bytes. With
+--audit, the updates are also broken down by the handler that sent them and
+the largest offenders are printed to stderr; this slows the timed loop, so
+compare audited runs only with each other.
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+
+import flet as ft
+
+from benchmarks.headless import headless_page
+from board_list import BoardList
+from main import TrelloApp
+from memory_store import InMemoryStore
+from models import BoardModel, BoardListModel, ItemModel
+from update_audit import audit
+
+PRIORITIES = ["normal", "high", "low"]
+LIST_COLORS = [ft.Colors.LIGHT_GREEN, ft.Colors.AMBER_500, ft.Colors.LIGHT_BLUE]
+
+# Operations traced for the memory figure; tracing slows everything down,
+# so this pass is kept shorter than the timed one.
+MEMORY_ITERATIONS = 50
+
+
+@dataclass
+class Workspace:
+    store: InMemoryStore
+    board_ids: list[int]
+    list_ids: list[int]
+    item_ids: list[int]
+    tags: list[str]
+
+
+def build_workspace(args) -> Workspace:
+    rng = random.Random(args.seed)
+    store = InMemoryStore()
+    tags = [f"tag{n}" for n in range(args.tags)]
+    boards = [
+        BoardModel(f"board {n}", board_id = id)
+        for n, id in enumerate(store.reserve_ids("board", args.boards))
+    ]
+    list_ids = store.reserve_ids("list", args.boards * args.lists)
+    lists = [
+        BoardListModel(
+            boards[n // args.lists].board_id,
+            f"list {n}",
+            LIST_COLORS[n % len(LIST_COLORS)],
+            board_list_id = id,
+        )
+        for n, id in enumerate(list_ids)
+    ]
+    item_ids = store.reserve_ids("item", len(lists) * args.cards)
+    items = [
+        ItemModel(
+            lists[n // args.cards].board_list_id,
+            f"card {n}",
+            rng.sample(tags, min(2, len(tags))),
+            rng.choice(PRIORITIES),
+            item_id = id,
+        )
+        for n, id in enumerate(item_ids)
+    ]
+    store.add_many(boards, lists, items)
+    return Workspace(
+        store, [b.board_id for b in boards], list(list_ids), list(item_ids), tags
+    )
+
+
+def mounted_app(workspace: Workspace) -> TrelloApp:
+    page = headless_page()
+    app = TrelloApp(page, workspace.store)
+    page.add(app)
+    return app
+
+
+BENCHMARKS: dict[str, Callable] = {}
+
+
+def benchmark(name: str):
+    """Register a setup function; it returns the step to time, which is
+    called with the iteration number"""
+
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+@benchmark("store.add_item")
+def store_add_item(args):
+    workspace = build_workspace(args)
+    store = workspace.store
+
+    def step(i):
+        list_id = workspace.list_ids[i % len(workspace.list_ids)]
+        store.add_item(list_id, ItemModel(list_id, f"new {i}", item_id = store.next_id("item")))
+
+    return step, None
+
+
+@benchmark("store.get_item")
+def store_get_item(args):
+    workspace = build_workspace(args)
+    rng = random.Random(args.seed)
+    ids = [rng.choice(workspace.item_ids) for _ in range(1024)]
+
+    def step(i):
+        workspace.store.get_item(ids[i % len(ids)])
+
+    return step, None
+
+
+@benchmark("store.remove_item")
+def store_remove_item(args):
+    workspace = build_workspace(args)
+    store = workspace.store
+    ids = random.Random(args.seed).sample(workspace.item_ids, len(workspace.item_ids))
+
+    def step(i):
+        item = store.get_item(ids[i % len(ids)])
+        store.remove_item(item.board_list_id, item.item_id)
+
+    return step, None
+
+
+@benchmark("board_list.filter_items")
+def board_list_filter_items(args):
+    workspace = build_workspace(args)
+    app = mounted_app(workspace)
+    app.set_board_view(workspace.board_ids[0])
+    board = app.active_view
+    queries = [board.tag_index.query(tag, "all") for tag in workspace.tags]
+    board_list = board.board_content.controls[0]
+
+    def step(i):
+        board_list.filter_items(queries[i % len(queries)])
+
+    return step, app
+
+
+@benchmark("board_list.add_item_reorder")
+def board_list_add_item_reorder(args):
+    workspace = build_workspace(args)
+    app = mounted_app(workspace)
+    app.set_board_view(workspace.board_ids[0])
+    board_list = app.active_view.board_content.controls[0]
+
+    def step(i):
+        # Drop the last card in the window onto the first one. The handler
+        # is async, so each drop runs on the page's event loop.
+        views = list(board_list.item_views.values())
+        app.page.loop.run_until_complete(
+            board_list.add_item(
+                chosen_control = views[-1].controls[1], swap_control = views[0].controls[1]
+            )
+        )
+
+    return step, app
+
+
+@benchmark("app.hydrate_all_boards_view")
+def app_hydrate_all_boards_view(args):
+    workspace = build_workspace(args)
+    app = mounted_app(workspace)
+    app.set_all_boards_view()
+    boards = workspace.store.get_boards()
+
+    def step(i):
+        board = boards[i % len(boards)]
+        workspace.store.update_board(board, {"name": f"board {i}"})
+        app.hydrate_all_boards_view()
+        app.page.update()
+
+    return step, app
+
+
+@benchmark("sidebar.sync_board_destinations")
+def sidebar_sync_board_destinations(args):
+    workspace = build_workspace(args)
+    app = mounted_app(workspace)
+    boards = workspace.store.get_boards()
+
+    def step(i):
+        board = boards[i % len(boards)]
+        workspace.store.update_board(board, {"name": f"board {i}"})
+        app.sidebar.sync_board_destinations()
+        app.page.update()
+
+    return step, app
+
+
+@benchmark("app.apply_theme")
+def app_apply_theme(args):
+    workspace = build_workspace(args)
+    app = mounted_app(workspace)
+    app.set_board_view(workspace.board_ids[0])
+
+    def step(i):
+        app.toggle_theme()
+
+    return step, app
+
+
+def percentile(sorted_values: list[int], p: float) -> int:
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def run_benchmark(name: str, args) -> dict:
+    step, app = BENCHMARKS[name](args)
+    connection = app.page._Page__conn if app is not None else None
+    sent = connection.bytes_sent if connection else 0
+    timings = []
+    for i in range(args.iterations):
+        start = time.perf_counter_ns()
+        step(i)
+        timings.append(time.perf_counter_ns() - start)
+    result = {
+        "name": name,
+        "iterations": args.iterations,
+        "ops_per_sec": round(args.iterations / (sum(timings) / 1e9), 1),
+        "p50_us": round(percentile(sorted(timings), 0.50) / 1e3, 2),
+        "p99_us": round(percentile(sorted(timings), 0.99) / 1e3, 2),
+    }
+    if connection:
+        result["update_bytes"] = round((connection.bytes_sent - sent) / args.iterations)
+
+    tracemalloc.start()
+    try:
+        step, _ = BENCHMARKS[name](args)
+        for i in range(min(args.iterations, MEMORY_ITERATIONS)):
+            step(i)
+        result["peak_kib"] = round(tracemalloc.get_traced_memory()[1] / 1024)
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output = True, text = True, check = True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, report: dict, threshold: float) -> bool:
+    """Print p50 changes against a previous report; True if any regressed"""
+    before = {r["name"]: r for r in baseline["results"]}
+    regressed = False
+    for result in report["results"]:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+        change = result["p50_us"] / old["p50_us"] - 1 if old["p50_us"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"{result['name']:36} p50 {old['p50_us']:>10} -> {result['p50_us']:>10} us"
+            f" ({change:+.1%}){flag}",
+            file = sys.stderr,
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Run the benchmark suite")
+    parser.add_argument("--boards", type = int, default = 20)
+    parser.add_argument("--lists", type = int, default = 5, help = "lists per board")
+    parser.add_argument("--cards", type = int, default = 200, help = "cards per list")
+    parser.add_argument("--tags", type = int, default = 50, help = "distinct tags")
+    parser.add_argument("--iterations", type = int, default = 200)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--only", action = "append", choices = sorted(BENCHMARKS))
+    parser.add_argument("--output", help = "write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help = "previous JSON report to compare against")
+    parser.add_argument(
+        "--compact-cards", action = "store_true",
+        help = "render cards without their own action menus",
+    )
+    parser.add_argument(
+        "--audit", action = "store_true",
+        help = "print the largest page updates per handler to stderr",
+    )
+    parser.add_argument(
+        "--threshold", type = float, default = 0.10,
+        help = "p50 slowdown that counts as a regression",
+    )
+    args = parser.parse_args()
+    if args.audit:
+        audit.enable()
+    BoardList.compact_cards = args.compact_cards
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "flet": ft.version.version,
+        "workspace": {
+            "boards": args.boards,
+            "lists_per_board": args.lists,
+            "cards_per_list": args.cards,
+            "tags": args.tags,
+            "compact_cards": args.compact_cards,
+        },
+        "results": [run_benchmark(name, args) for name in args.only or BENCHMARKS],
+    }
+    if args.audit:
+        audit.print_report()
+    text = json.dumps(report, indent = 2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(json.load(f), report, args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
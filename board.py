@@ -1,18 +1,33 @@
-import itertools
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from async_store import AsyncDataStore
 import flet as ft
 from board_list import BoardList
+from change_feed import Change, on_loop
 from data_store import DataStore
+from debouncer import Debouncer
+from models import BoardModel, BoardListModel
+from tag_index import TagIndex
+from render_batch import batched
+from metrics import timed
 
 
 class Board(ft.Container):
-    id_counter = itertools.count()
+    # Seconds the search field and priority filter must be idle before the
+    # cards are filtered; only the latest query is ever applied.
+    search_delay = 0.3
 
-    def __init__(self, app, store: DataStore, name: str, page: ft.Page):
+    def __init__(self, app, store: DataStore, model: BoardModel, page: ft.Page):
         self.page: ft.Page = page
-        self.board_id = next(Board.id_counter)
+        self.model: BoardModel = model
         self.store: DataStore = store
         self.app = app
-        self.name = name
+        self.tag_index = TagIndex(self.store.get_items_by_board(self.board_id))
+        self.filter_debouncer = Debouncer(self.page.loop, self.search_delay, self.run_filters)
+        self.subscription = self.store.subscribe(
+            self.board_id, on_loop(self.page.loop, self.apply_change)
+        )
         
         self.search_field = ft.TextField(
             hint_text="Search by tags",
@@ -76,8 +91,10 @@ class Board(ft.Container):
             expand=True
         )
         
-        for l in self.store.get_lists_by_board(self.board_id):
-            self.add_list(l)
+        self.board_content.controls[:-1] = [
+            BoardList(self, self.store, l, self.page)
+            for l in self.store.get_lists_by_board(self.board_id)
+        ]
 
         super().__init__(
             content = self.board_lists,
@@ -86,19 +103,86 @@ class Board(ft.Container):
             padding = ft.padding.only(top = 10, right = 0),
             height = self.app.page.height,
         )
+
+    @property
+    def board_id(self) -> int:
+        return self.model.board_id
+
+    @property
+    def name(self) -> str:
+        return self.model.name
+
+    @property
+    def async_store(self) -> "AsyncDataStore":
+        return self.app.async_store
         
     def filter_by_tag(self, e):
-        search_text = self.search_field.value.strip().lower()
-        self.clear_search_button.visible = bool(search_text)
-        
-        if not search_text and self.priority_filter.value == "all":
-            self.show_all_items()
+        self.filter_debouncer()
+    
+    def dispose(self):
+        self.filter_debouncer.cancel()
+        self.store.unsubscribe(self.subscription)
+        self.subscription = None
+
+    @batched
+    def apply_change(self, change: Change):
+        # Changes made by this session are already on screen, and a change
+        # queued before the view was dropped has nothing to update. Records
+        # come with the change, so nothing here waits on the store.
+        if change.origin is self.store or self.subscription is None:
             return
-        
-        self.apply_filters()
+        lists = {
+            c.board_list_id: c for c in self.board_content.controls if isinstance(c, BoardList)
+        }
+        if change.kind == "list":
+            board_list = lists.get(change.id)
+            if change.action == "add":
+                # Its cards arrive as changes of their own.
+                self.board_content.controls.insert(
+                    -1, BoardList(self, self.store, change.model, self.page, [])
+                )
+            elif board_list is None:
+                return
+            elif change.action == "update":
+                board_list.show_title()
+            elif change.action == "remove":
+                self.board_content.controls.remove(board_list)
+                for item in board_list.item_models:
+                    self.tag_index.remove_item(item.item_id)
+        else:
+            board_list = lists.get(change.list_id)
+            if change.action == "move":
+                model = None
+                for source in lists.values():
+                    model = source.discard_item(change.id)
+                    if model is not None:
+                        break
+                if board_list is not None:
+                    board_list.insert_item_model(
+                        min(change.index, len(board_list.item_models)),
+                        model or change.model,
+                    )
+                    board_list.refresh_shown_items()
+            elif board_list is None:
+                return
+            elif change.action == "add":
+                board_list.insert_item_model(len(board_list.item_models), change.model)
+                board_list.refresh_shown_items()
+                self.tag_index.add_item(change.model)
+            elif change.action == "update":
+                self.tag_index.remove_item(change.id)
+                self.tag_index.add_item(change.model)
+                board_list.redraw_item(change.id)
+            elif change.action == "remove":
+                board_list.discard_item(change.id)
+                self.tag_index.remove_item(change.id)
+        if self.search_field.value or self.priority_filter.value != "all":
+            self.apply_filters()
         self.page.update()
-    
+
+    @batched
     def clear_search(self, e):
+        self.filter_debouncer.cancel()
         self.search_field.value = ""
         self.clear_search_button.visible = False
         
@@ -116,27 +200,38 @@ class Board(ft.Container):
         self.page.update()
 
     def filter_by_priority(self, e):
-        priority = self.priority_filter.value
+        self.filter_debouncer()
+
+    @batched
+    def run_filters(self, generation: int):
+        search_text = self.search_field.value.strip().lower()
+        self.clear_search_button.visible = bool(search_text)
         
-        if priority == "all" and (not self.search_field.value or self.search_field.value.strip() == ""):
+        if not search_text and self.priority_filter.value == "all":
             self.show_all_items()
             return
         
-        self.apply_filters()
-        self.page.update()
+        if self.apply_filters(generation):
+            self.page.update()
     
-    def apply_filters(self):
+    def apply_filters(self, generation: int | None = None) -> bool:
         search_text = self.search_field.value.strip().lower()
         priority = self.priority_filter.value
+        matching = self.tag_index.query(search_text, priority)
         
         for control in self.board_content.controls:
+            if generation is not None and not self.filter_debouncer.is_current(generation):
+                return False
             if isinstance(control, BoardList):
-                control.filter_items(search_text, priority)
+                control.filter_items(matching)
+        return True
 
     def resize(self, nav_rail_extended, width, height):
         self.board_content.width = (width - 310) if nav_rail_extended else (width - 50)
         self.height = height
-        self.update()
+        # Goes through the page so it also works while the view is being
+        # mounted by the enclosing render batch.
+        self.app.page.update(self)
 
     def create_list(self, e):
 
@@ -173,18 +268,19 @@ class Board(ft.Container):
             v.on_click = set_color
             color_options.controls.append(v)
 
-        def close_dlg(e):
+        @timed
+        async def close_dlg(e):
             if (hasattr(e.control, "text") and not e.control.text == "Cancel") or (
                 type(e.control) is ft.TextField and e.control.value != ""
             ):
-                new_list = BoardList(
-                    self,
-                    self.store,
-                    dialog_text.value,
-                    self.page,
-                    color=color_options.data,
+                await self.add_list(
+                    BoardListModel(
+                        self.board_id,
+                        dialog_text.value,
+                        color_options.data,
+                        board_list_id = await self.async_store.next_id("list"),
+                    )
                 )
-                self.add_list(new_list)
             self.page.close(dialog)
 
         def textfield_change(e):
@@ -224,14 +320,20 @@ class Board(ft.Container):
         self.page.open(dialog)
         dialog_text.focus()
 
-    def remove_list(self, list: BoardList, e):
+    @batched
+    async def remove_list(self, list: BoardList, e):
+        await self.async_store.remove_list(self.board_id, list.board_list_id)
         self.board_content.controls.remove(list)
-        self.store.remove_list(self.board_id, list.board_list_id)
+        for item in list.item_models:
+            self.tag_index.remove_item(item.item_id)
         self.page.update()
 
-    def add_list(self, list):
-        self.board_content.controls.insert(-1, list)
-        self.store.add_list(self.board_id, list)
+    @batched
+    async def add_list(self, model: BoardListModel):
+        await self.async_store.add_list(self.board_id, model)
+        self.board_content.controls.insert(
+            -1, BoardList(self, self.store, model, self.page)
+        )
         self.page.update()
 
     def color_option_creator(self, color: str):
@@ -1,36 +1,67 @@
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from async_store import AsyncDataStore
     from board import Board
-import itertools
+import inspect
+
 import flet as ft
 from item import Item
 from data_store import DataStore
+from models import BoardListModel, ItemModel
+from render_batch import batched
 
 
 class BoardList(ft.Container):
-    id_counter = itertools.count()
+    # Cards are laid out at a fixed height so the list can be windowed: only
+    # the cards in view plus `overscan` on either side are built as controls,
+    # and two spacers stand in for everything above and below the window.
+    item_extent = 64
+    viewport_height = 480
+    overscan = 4
+    # Compact cards drop their own action menu for one shared by the list,
+    # which cuts the controls built and sent per card.
+    compact_cards = False
 
     def __init__(
         self,
         board: "Board",
         store: DataStore,
-        title: str,
+        model: BoardListModel,
         page: ft.Page,
-        color: str = "",
+        item_models: list[ItemModel] | None = None,
     ):
         self.page: ft.Page = page
-        self.board_list_id = next(BoardList.id_counter)
+        self.model: BoardListModel = model
         self.store: DataStore = store
         self.board = board
-        self.title = title
-        self.color = color
-        self.items = ft.Column([], tight = True, spacing = 4)
-        self.items.controls = self.store.get_items(self.board_list_id)
+        self.item_models: list[ItemModel] = (
+            self.store.get_items(self.board_list_id) if item_models is None else item_models
+        )
+        # item id -> index in item_models. Entries below `stale_from` are
+        # exact; the tail is renumbered lazily on the next lookup into it.
+        self.positions: dict[int, int] = {
+            m.item_id: i for i, m in enumerate(self.item_models)
+        }
+        self.stale_from = len(self.item_models)
+        self.item_filter = None
+        self.shown_items: list[ItemModel] = self.item_models
+        self.item_views: dict[int, ft.Column] = {}
+        self.card_menu: ft.AlertDialog | None = None
+        self.card_menu_item: Item | None = None
+        self.window_start = 0
+        self.top_spacer = ft.Container(height = 0)
+        self.bottom_spacer = ft.Container(height = 0)
+        self.items = ft.ListView(
+            spacing = 0,
+            on_scroll = self.items_scroll,
+            on_scroll_interval = 50,
+        )
+        self.render_window()
         self.new_item_field = ft.TextField(
             label = "new card name",
             height = 50,
-            bgcolor = ft.Colors.WHITE,
+            bgcolor = ft.Colors.SURFACE,
             on_submit = self.add_item_handler,
         )
 
@@ -111,7 +142,7 @@ class BoardList(ft.Container):
                         content=ft.Row(
                             [
                                 ft.Icon(ft.Icons.ADD),
-                                ft.Text("add card", color = ft.Colors.BLACK38),
+                                ft.Text("add card", color = ft.Colors.ON_SURFACE_VARIANT),
                             ],
                             tight = True,
                         ),
@@ -127,7 +158,7 @@ class BoardList(ft.Container):
             width = 250,
             border = ft.border.all(2, ft.Colors.BLACK12),
             border_radius = ft.border_radius.all(5),
-            bgcolor = self.color if (self.color != "") else ft.Colors.BACKGROUND,
+            bgcolor = self.color if (self.color != "") else ft.Colors.SURFACE,
             padding = ft.padding.only(bottom = 10, right = 10, left = 10, top = 5),
         )
 
@@ -151,22 +182,41 @@ class BoardList(ft.Container):
         )
         super().__init__(content=self.view, data=self)
 
-    def item_drag_accept(self, e):
+    @property
+    def board_list_id(self) -> int:
+        return self.model.board_list_id
+
+    @property
+    def title(self) -> str:
+        return self.model.title
+
+    @property
+    def color(self) -> str:
+        return self.model.color
+
+    @property
+    def async_store(self) -> "AsyncDataStore":
+        return self.board.async_store
+
+    @batched
+    async def item_drag_accept(self, e):
         src = self.page.get_control(e.src_id)
-        self.add_item(src.data.item_text)
-        src.data.list.remove_item(src.data)
+        await self.add_item(chosen_control=src.data)
         self.end_indicator.opacity = 0.0
         self.update()
 
+    @batched
     def item_will_drag_accept(self, e):
         if e.data == "true":
             self.end_indicator.opacity = 1.0
         self.update()
 
+    @batched
     def item_drag_leave(self, e):
         self.end_indicator.opacity = 0.0
         self.update()
 
+    @batched
     def list_drag_accept(self, e):
         src = self.page.get_control(e.src_id)
         l = self.board.content.controls
@@ -185,16 +235,18 @@ class BoardList(ft.Container):
         self.inner_list.border = ft.border.all(2, ft.Colors.BLACK12)
         self.update()
 
-    def delete_list(self, e):
-        self.board.remove_list(self, e)
+    async def delete_list(self, e):
+        await self.board.remove_list(self, e)
 
     def edit_title(self, e):
         self.header.controls[0] = self.edit_field
         self.header.controls[1].visible = False
         self.update()
 
-    def save_title(self, e):
-        self.title = self.edit_field.controls[0].value
+    async def save_title(self, e):
+        await self.async_store.update_list(
+            self.model, {"title": self.edit_field.controls[0].value}
+        )
         self.header.controls[0] = ft.Text(
             value = self.title,
             theme_style = ft.TextThemeStyle.TITLE_MEDIUM,
@@ -205,28 +257,138 @@ class BoardList(ft.Container):
         self.header.controls[1].visible = True
         self.update()
 
-    def add_item_handler(self, e):
+    async def add_item_handler(self, e):
         if self.new_item_field.value == "":
             return
-        self.add_item()
+        await self.add_item()
 
-    def add_item(
+    @batched
+    async def add_item(
         self,
         item: str | None = None,
-        chosen_control: ft.Draggable | None = None,
-        swap_control: ft.Draggable | None = None,
+        chosen_control: Item | None = None,
+        swap_control: Item | None = None,
     ):
+        if chosen_control is not None:
+            await self.move_item(chosen_control, self.drop_index(swap_control))
+            if swap_control is not None:
+                self.set_indicator_opacity(swap_control, 0.0)
 
-        controls_list = [x.controls[1] for x in self.items.controls]
-        to_index = (
-            controls_list.index(swap_control) if swap_control in controls_list else None
-        )
-        from_index = (
-            controls_list.index(chosen_control)
-            if chosen_control in controls_list
-            else None
-        )
-        control_to_add = ft.Column(
+        else:
+            model = ItemModel(
+                self.board_list_id,
+                item or self.new_item_field.value,
+                item_id = await self.async_store.next_id("item"),
+            )
+            await self.async_store.add_item(self.board_list_id, model)
+            self.board.tag_index.add_item(model)
+            # Other sessions' cards may have arrived while the write was
+            # awaited, so the position is taken only now.
+            self.insert_item_model(self.drop_index(swap_control), model)
+            if item is None:
+                self.new_item_field.value = ""
+            self.refresh_shown_items()
+
+        self.page.update()
+
+    def drop_index(self, swap_control: Item | None) -> int:
+        if swap_control is not None and swap_control.list is self:
+            return self.position_of(swap_control.item_id)
+        return len(self.item_models)
+
+    async def move_item(self, item: Item, index: int):
+        """Re-parent an existing card into this list at `index`, keeping its
+        model and, when it is on screen, its control"""
+        source = item.list
+        container = source.detach_item(item)
+        index = min(index, len(self.item_models))
+        await self.async_store.move_item(item.item_id, self.board_list_id, index)
+        self.insert_item_model(index, item.model)
+        item.list = self
+        item.card_item.data = self
+        if container is not None:
+            self.item_views[item.item_id] = container
+        self.refresh_shown_items()
+        if source is not self:
+            source.refresh_shown_items()
+
+    def detach_item(self, item: Item) -> ft.Column | None:
+        self.remove_item_model(item.model)
+        return self.item_views.pop(item.item_id, None)
+
+    def position_of(self, item_id: int) -> int:
+        position = self.positions[item_id]
+        if position >= self.stale_from:
+            for i in range(self.stale_from, len(self.item_models)):
+                self.positions[self.item_models[i].item_id] = i
+            self.stale_from = len(self.item_models)
+            position = self.positions[item_id]
+        return position
+
+    def insert_item_model(self, index: int, model: ItemModel):
+        self.item_models.insert(index, model)
+        self.positions[model.item_id] = index
+        self.stale_from = min(self.stale_from, index)
+
+    def remove_item_model(self, model: ItemModel) -> int:
+        index = self.position_of(model.item_id)
+        del self.item_models[index]
+        del self.positions[model.item_id]
+        self.stale_from = min(self.stale_from, index)
+        return index
+
+    def discard_item(self, item_id: int) -> ItemModel | None:
+        """Drop a card that another session removed or moved away"""
+        if item_id not in self.positions:
+            return None
+        model = self.item_models[self.position_of(item_id)]
+        self.remove_item_model(model)
+        self.item_views.pop(item_id, None)
+        self.refresh_shown_items()
+        return model
+
+    def redraw_item(self, item_id: int):
+        """Rebuild a card's control after another session edited it"""
+        self.item_views.pop(item_id, None)
+        self.refresh_shown_items()
+
+    def show_title(self):
+        if isinstance(self.header.controls[0], ft.Text):
+            self.header.controls[0].value = self.title
+        self.inner_list.bgcolor = self.color if (self.color != "") else ft.Colors.SURFACE
+
+    def open_card_menu(self, item: Item):
+        """Open the action menu shared by this list's compact cards"""
+        if self.card_menu is None:
+            self.card_menu = ft.AlertDialog(
+                title = ft.Text(theme_style = ft.TextThemeStyle.TITLE_SMALL),
+                content = ft.Column(
+                    [
+                        ft.TextButton(text = text, data = action, on_click = self.card_menu_click)
+                        for text, action in [
+                            ("Edit", "edit_item"),
+                            ("Set Priority", "change_priority"),
+                            ("Add Tag", "add_tag"),
+                            ("Delete", "delete_item"),
+                        ]
+                    ],
+                    tight = True,
+                ),
+            )
+        self.card_menu_item = item
+        self.card_menu.title.value = item.item_text
+        self.page.open(self.card_menu)
+
+    async def card_menu_click(self, e):
+        item, self.card_menu_item = self.card_menu_item, None
+        self.page.close(self.card_menu)
+        if item is not None:
+            result = getattr(item, e.control.data)(e)
+            if inspect.isawaitable(result):
+                await result
+
+    def item_container(self, item: Item):
+        return ft.Column(
             [
                 ft.Container(
                     bgcolor = ft.Colors.BLACK26,
@@ -235,66 +397,68 @@ class BoardList(ft.Container):
                     alignment = ft.alignment.center_right,
                     width = 200,
                     opacity = 0.0,
-                )
-            ]
+                ),
+                item,
+            ],
+            height = self.item_extent,
+            spacing = 4,
         )
 
-        if (from_index is not None) and (to_index is not None):
-            self.items.controls.insert(to_index, self.items.controls.pop(from_index))
-            self.set_indicator_opacity(swap_control, 0.0)
-
-        elif to_index is not None:
-            new_item = Item(self, self.store, item)
-            control_to_add.controls.append(new_item)
-            self.items.controls.insert(to_index, control_to_add)
+    def render_window(self):
+        count = len(self.shown_items)
+        window_size = self.viewport_height // self.item_extent + 2 * self.overscan
+        start = max(0, min(self.window_start, count - window_size))
+        end = min(count, start + window_size)
+        views = {}
+        for model in self.shown_items[start:end]:
+            views[model.item_id] = self.item_views.get(model.item_id) or (
+                self.item_container(Item(self, self.store, model))
+            )
+        self.item_views = views
+        self.window_start = start
+        self.top_spacer.height = start * self.item_extent
+        self.bottom_spacer.height = (count - end) * self.item_extent
+        self.items.controls = [self.top_spacer, *views.values(), self.bottom_spacer]
+        self.items.height = min(count * self.item_extent, self.viewport_height)
 
+    def refresh_shown_items(self):
+        if self.item_filter is None:
+            self.shown_items = self.item_models
         else:
-            new_item = (
-                Item(self, self.store, item)
-                if item
-                else Item(self, self.store, self.new_item_field.value)
-            )
-            control_to_add.controls.append(new_item)
-            self.items.controls.append(control_to_add)
-            self.store.add_item(self.board_list_id, new_item)
-            self.new_item_field.value = ""
+            self.shown_items = [m for m in self.item_models if self.item_filter(m)]
+        self.render_window()
 
-        self.page.update()
+    def items_scroll(self, e: ft.OnScrollEvent):
+        first = int(e.pixels // self.item_extent)
+        start = max(0, first - first % self.overscan - self.overscan)
+        if start == self.window_start:
+            return
+        self.window_start = start
+        self.render_window()
+        self.items.update()
 
-    def remove_item(self, item: Item):
-        controls_list = [x.controls[1] for x in self.items.controls]
-        del self.items.controls[controls_list.index(item)]
-        self.store.remove_item(self.board_list_id, item.item_id)
+    @batched
+    async def remove_item(self, item: Item):
+        await self.async_store.remove_item(self.board_list_id, item.item_id)
+        self.remove_item_model(item.model)
+        self.board.tag_index.remove_item(item.item_id)
+        self.refresh_shown_items()
         self.view.update()
 
     def set_indicator_opacity(self, item, opacity):
-        controls_list = [x.controls[1] for x in self.items.controls]
-        self.items.controls[controls_list.index(item)].controls[0].opacity = opacity
+        if item.item_id in self.item_views:
+            self.item_views[item.item_id].controls[0].opacity = opacity
         self.view.update()
 
-    def filter_items(self, tag_text="", priority="all"):
-        for item_container in self.items.controls:
-            if len(item_container.controls) > 1:
-                item = item_container.controls[1]
-                
-                has_tag = True
-                if tag_text:
-                    has_tag = False
-                    if hasattr(item, 'tags'):
-                        for item_tag in item.tags:
-                            if tag_text.lower() in item_tag.lower():
-                                has_tag = True
-                                break
-                
-                matches_priority = True
-                if priority != "all" and hasattr(item, 'priority'):
-                    matches_priority = (item.priority == priority)
-                
-                item_container.visible = has_tag and matches_priority
-        
+    @batched
+    def filter_items(self, matching: set[int]):
+        self.item_filter = lambda item: item.item_id in matching
+        self.window_start = 0
+        self.refresh_shown_items()
         self.update()
     
+    @batched
     def show_all_items(self):
-        for item_container in self.items.controls:
-            item_container.visible = True
-        self.update()
\ No newline at end of file
+        self.item_filter = None
+        self.refresh_shown_items()
+        self.update()
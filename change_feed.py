@@ -0,0 +1,102 @@
+import asyncio
+import contextvars
+import inspect
+import itertools
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+# Topic for changes to the set of boards itself; changes inside a board are
+# published on its board id.
+WORKSPACE = "workspace"
+
+
+@dataclass(slots=True)
+class Change:
+    kind: str
+    action: str
+    id: int
+    board_id: int
+    list_id: int | None = None
+    index: int | None = None
+    # The added, updated or moved record, so subscribers needn't read it
+    # back from the store.
+    model: object = None
+    origin: object = None
+
+
+class ChangeFeed:
+    """In-process publish/subscribe bus for store changes.
+
+    Subscribers register per topic, so a session only hears about the board
+    it has open. Callbacks run on the publishing thread, after the store has
+    released its lock; one failing subscriber doesn't stop the others.
+    Sessions subscribe through `on_loop`, so their views are only ever
+    touched on their own event loop.
+    """
+
+    def __init__(self):
+        self.subscribers: dict[Hashable, dict[int, Callable[[Change], None]]] = {}
+        self.topics: dict[int, Hashable] = {}
+        self.tokens = itertools.count()
+        self.lock = threading.Lock()
+
+    def subscribe(self, topic: Hashable, callback: Callable[[Change], None]) -> int:
+        with self.lock:
+            token = next(self.tokens)
+            self.subscribers.setdefault(topic, {})[token] = callback
+            self.topics[token] = topic
+            return token
+
+    def unsubscribe(self, token: int):
+        with self.lock:
+            topic = self.topics.pop(token, None)
+            if topic is None:
+                return
+            callbacks = self.subscribers[topic]
+            del callbacks[token]
+            if not callbacks:
+                del self.subscribers[topic]
+
+    def publish(self, topic: Hashable, change: Change):
+        with self.lock:
+            callbacks = list(self.subscribers.get(topic, {}).values())
+        for callback in callbacks:
+            try:
+                callback(change)
+            except Exception:
+                logger.exception("change subscriber failed on %s", topic)
+
+
+def on_loop(
+    loop: asyncio.AbstractEventLoop, callback: Callable[[Change], None]
+) -> Callable[[Change], None]:
+    """Wrap `callback` so each change is handed to `loop` and applied there.
+
+    Changes are published from whichever thread made them, usually a worker
+    running another session's store call, while a session's view state is
+    also changed by its own handlers on its loop. `callback` may be a
+    coroutine function; it then runs as a task.
+    """
+    tasks: set[asyncio.Task] = set()
+
+    def run(change: Change):
+        result = callback(change)
+        if inspect.isawaitable(result):
+            task = loop.create_task(result)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    def deliver(change: Change):
+        try:
+            # A fresh context, so the publisher's metrics and audit state
+            # don't leak into the subscriber's session.
+            loop.call_soon_threadsafe(run, change, context = contextvars.Context())
+        except RuntimeError:
+            # The session's loop is closed; it has nothing left to update.
+            pass
+
+    return deliver
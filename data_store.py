@@ -1,21 +1,26 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator
 
 if TYPE_CHECKING:
-    from board import Board
-    from board_list import BoardList
+    from models import BoardModel, BoardListModel, ItemModel
+    from search_index import SearchHit
     from user import User
-    from item import Item
 
 
 class DataStore:
+    """Storage interface for boards, lists, cards and users.
+
+    Ids for new boards ("board"), lists ("list") and cards ("item") are
+    handed out by the store, so they stay unique across restarts and across
+    every process sharing the same backing data.
+    """
 
     def add_board(self, model) -> None:
         raise NotImplementedError
 
-    def get_board(self, id) -> "Board":
+    def get_board(self, id) -> "BoardModel":
         raise NotImplementedError
 
-    def get_boards(self) -> list["Board"]:
+    def get_boards(self) -> list["BoardModel"]:
         raise NotImplementedError
 
     def update_board(self, model, update):
@@ -39,13 +44,16 @@ class DataStore:
     def add_list(self, board, model) -> None:
         raise NotImplementedError
 
-    def get_lists(self) -> list["BoardList"]:
+    def get_lists(self) -> list["BoardListModel"]:
+        raise NotImplementedError
+
+    def get_list(self, id) -> "BoardListModel":
         raise NotImplementedError
 
-    def get_list(self, id) -> "BoardList":
+    def get_lists_by_board(self, board) -> list["BoardListModel"]:
         raise NotImplementedError
 
-    def get_lists_by_board(self, board) -> list["BoardList"]:
+    def update_list(self, model, update):
         raise NotImplementedError
 
     def remove_list(self, board, id) -> None:
@@ -54,14 +62,149 @@ class DataStore:
     def add_item(self, board_list, model) -> None:
         raise NotImplementedError
 
-    def get_items(self, board_list) -> list["Item"]:
+    def get_items(self, board_list) -> list["ItemModel"]:
+        raise NotImplementedError
+
+    def iter_items(self, board_list) -> Iterator["ItemModel"]:
+        """A list's cards in order, for one-pass reads such as exports.
+
+        Unlike get_items, a store that caches models doesn't keep these.
+        """
+        return iter(self.get_items(board_list))
+
+    def get_item(self, id) -> "ItemModel":
+        raise NotImplementedError
+
+    def get_items_by_board(self, board) -> list["ItemModel"]:
         raise NotImplementedError
 
-    def get_item(self, id) -> "Item":
+    def update_item(self, model, update):
         raise NotImplementedError
 
-    def get_items_by_board(self, board) -> list["Item"]:
+    def move_item(self, item_id, to_list, index) -> None:
         raise NotImplementedError
 
     def remove_item(self, board_list, id) -> None:
         raise NotImplementedError
+
+    def add_many(self, boards, lists, items) -> None:
+        """Insert boards, then lists, then items in one bulk write"""
+        raise NotImplementedError
+
+    def next_id(self, kind) -> int:
+        return self.reserve_ids(kind, 1)[0]
+
+    def reserve_ids(self, kind, count) -> range:
+        """Allocate `count` consecutive ids of `kind` for bulk inserts"""
+        raise NotImplementedError
+
+    def search(self, query, limit) -> list["SearchHit"]:
+        raise NotImplementedError
+
+    def subscribe(self, topic, callback) -> int | None:
+        """Call `callback` with each Change another session makes to `topic`.
+
+        A store that only one session uses has no changes to report.
+        """
+        return None
+
+    def unsubscribe(self, token) -> None:
+        pass
+
+
+class DelegatingStore(DataStore):
+    """DataStore that forwards every call to `inner`.
+
+    Wrappers that add behaviour around a store (journaling, buffering,
+    locking) subclass this and override only the methods they care about.
+    """
+
+    def __init__(self, inner: DataStore):
+        self.inner = inner
+
+    def add_board(self, model):
+        self.inner.add_board(model)
+
+    def get_board(self, id):
+        return self.inner.get_board(id)
+
+    def get_boards(self):
+        return self.inner.get_boards()
+
+    def update_board(self, model, update):
+        self.inner.update_board(model, update)
+
+    def remove_board(self, board):
+        self.inner.remove_board(board)
+
+    def add_user(self, model):
+        self.inner.add_user(model)
+
+    def get_users(self):
+        return self.inner.get_users()
+
+    def get_user(self, id):
+        return self.inner.get_user(id)
+
+    def remove_user(self, id):
+        self.inner.remove_user(id)
+
+    def add_list(self, board, model):
+        self.inner.add_list(board, model)
+
+    def get_lists(self):
+        return self.inner.get_lists()
+
+    def get_list(self, id):
+        return self.inner.get_list(id)
+
+    def get_lists_by_board(self, board):
+        return self.inner.get_lists_by_board(board)
+
+    def update_list(self, model, update):
+        self.inner.update_list(model, update)
+
+    def remove_list(self, board, id):
+        self.inner.remove_list(board, id)
+
+    def add_item(self, board_list, model):
+        self.inner.add_item(board_list, model)
+
+    def get_items(self, board_list):
+        return self.inner.get_items(board_list)
+
+    def iter_items(self, board_list):
+        return self.inner.iter_items(board_list)
+
+    def get_item(self, id):
+        return self.inner.get_item(id)
+
+    def get_items_by_board(self, board):
+        return self.inner.get_items_by_board(board)
+
+    def update_item(self, model, update):
+        self.inner.update_item(model, update)
+
+    def move_item(self, item_id, to_list, index):
+        self.inner.move_item(item_id, to_list, index)
+
+    def remove_item(self, board_list, id):
+        self.inner.remove_item(board_list, id)
+
+    def add_many(self, boards, lists, items):
+        self.inner.add_many(boards, lists, items)
+
+    def next_id(self, kind):
+        return self.inner.next_id(kind)
+
+    def reserve_ids(self, kind, count):
+        return self.inner.reserve_ids(kind, count)
+
+    def search(self, query, limit):
+        return self.inner.search(query, limit)
+
+    def subscribe(self, topic, callback):
+        return self.inner.subscribe(topic, callback)
+
+    def unsubscribe(self, token):
+        self.inner.unsubscribe(token)
@@ -0,0 +1,67 @@
+import asyncio
+import contextvars
+import inspect
+import threading
+from typing import Callable
+
+
+class Debouncer:
+    """Coalesces bursts of calls into one run of `callback`.
+
+    Each call restarts the `delay` timer, so the callback only runs once the
+    input has been quiet for `delay` seconds, and only with the latest
+    arguments. The callback receives the generation it was scheduled under;
+    long runs should check `is_current(generation)` and stop early once a
+    newer call has made them stale.
+
+    The timer lives on `loop`, the session's event loop, so the callback
+    runs there like the session's other view updates; it may be a
+    coroutine function. Calls may come from any thread.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        delay: float,
+        callback: Callable,
+    ):
+        self.loop = loop
+        self.delay = delay
+        self.callback = callback
+        self.generation = 0
+        # Only touched on the loop.
+        self.timer: asyncio.TimerHandle | None = None
+        self.task: asyncio.Task | None = None
+        self.lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+        # A fresh context, so the run isn't attributed to the calling handler.
+        self.loop.call_soon_threadsafe(
+            self.schedule, generation, args, context = contextvars.Context()
+        )
+
+    def schedule(self, generation: int, args: tuple):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.is_current(generation):
+            self.timer = self.loop.call_later(self.delay, self.run, generation, *args)
+
+    def run(self, generation: int, *args):
+        self.timer = None
+        if self.is_current(generation):
+            result = self.callback(generation, *args)
+            if inspect.isawaitable(result):
+                self.task = self.loop.create_task(result)
+
+    def is_current(self, generation: int) -> bool:
+        return generation == self.generation
+
+    def cancel(self):
+        """Drop the pending call and mark any in-flight run as stale"""
+        with self.lock:
+            # A pending timer still fires, but finds its generation stale.
+            self.generation += 1
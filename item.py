@@ -1,24 +1,34 @@
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from async_store import AsyncDataStore
     from board_list import BoardList
-import itertools
 import flet as ft
 from data_store import DataStore
+from models import ItemModel
+from render_batch import batched
+from metrics import timed
+
+
+def menu_entry(text: str, on_click) -> ft.PopupMenuItem:
+    return ft.PopupMenuItem(
+        content=ft.Text(
+            value=text,
+            theme_style=ft.TextThemeStyle.LABEL_MEDIUM,
+            text_align=ft.TextAlign.CENTER,
+        ),
+        on_click=on_click,
+    )
 
 
 class Item(ft.Container):
-    id_counter = itertools.count()
 
-    def __init__(self, list: "BoardList", store: DataStore, item_text: str):
-        self.item_id = next(Item.id_counter)
+    def __init__(self, list: "BoardList", store: DataStore, model: ItemModel):
+        self.model: ItemModel = model
         self.store: DataStore = store
         self.list = list
-        self.item_text = item_text
-        self.tags = []
-        self.priority = "normal"
         
-        self.checkbox = ft.Checkbox(label=f"{self.item_text}", width=200)
+        self.checkbox = ft.Checkbox(label=self.label_text(), width=200)
         
         self.priority_indicator = ft.Container(
             width=10,
@@ -28,45 +38,24 @@ class Item(ft.Container):
             margin=ft.margin.only(right=5)
         )
         
-        self.popup_menu = ft.PopupMenuButton(
-            items=[
-                ft.PopupMenuItem(
-                    content=ft.Text(
-                        value="Edit",
-                        theme_style=ft.TextThemeStyle.LABEL_MEDIUM,
-                        text_align=ft.TextAlign.CENTER,
-                    ),
-                    on_click=self.edit_item,
-                ),
-                ft.PopupMenuItem(),
-                ft.PopupMenuItem(
-                    content=ft.Text(
-                        value="Set Priority",
-                        theme_style=ft.TextThemeStyle.LABEL_MEDIUM,
-                        text_align=ft.TextAlign.CENTER,
-                    ),
-                    on_click=self.change_priority,
-                ),
-                ft.PopupMenuItem(),
-                ft.PopupMenuItem(
-                    content=ft.Text(
-                        value="Add Tag",
-                        theme_style=ft.TextThemeStyle.LABEL_MEDIUM,
-                        text_align=ft.TextAlign.CENTER,
-                    ),
-                    on_click=self.add_tag,
-                ),
-                ft.PopupMenuItem(),
-                ft.PopupMenuItem(
-                    content=ft.Text(
-                        value="Delete",
-                        theme_style=ft.TextThemeStyle.LABEL_MEDIUM,
-                        text_align=ft.TextAlign.CENTER,
-                    ),
-                    on_click=self.delete_item,
-                ),
-            ],
-        )
+        if self.list.compact_cards:
+            # Compact cards open their list's shared action menu instead of
+            # each carrying a menu of their own.
+            self.popup_menu = ft.IconButton(
+                icon=ft.Icons.MORE_VERT, on_click=self.open_menu
+            )
+        else:
+            self.popup_menu = ft.PopupMenuButton(
+                items=[
+                    menu_entry("Edit", self.edit_item),
+                    ft.PopupMenuItem(),
+                    menu_entry("Set Priority", self.change_priority),
+                    ft.PopupMenuItem(),
+                    menu_entry("Add Tag", self.add_tag),
+                    ft.PopupMenuItem(),
+                    menu_entry("Delete", self.delete_item),
+                ],
+            )
         
         self.card_item = ft.Card(
             content=ft.Row(
@@ -94,18 +83,10 @@ class Item(ft.Container):
             data=self.list,
         )
         
-        self.edit_field = ft.Row(
-            [
-                ft.TextField(
-                    value=self.item_text,
-                    width=150,
-                    height=40,
-                    content_padding=ft.padding.only(left=10, bottom=10),
-                ),
-                ft.TextButton(text="Save", on_click=self.save_item_text),
-            ]
-        )
-        
+        # Only one card is edited at a time, so the edit row is built when
+        # editing starts and dropped when it is saved.
+        self.edit_field: ft.Row | None = None
+
         self.view = ft.Draggable(
             group="items",
             content=ft.DragTarget(
@@ -119,29 +100,76 @@ class Item(ft.Container):
         )
         super().__init__(content=self.view)
 
+    @property
+    def item_id(self) -> int:
+        return self.model.item_id
+
+    @property
+    def item_text(self) -> str:
+        return self.model.item_text
+
+    @property
+    def tags(self) -> list[str]:
+        return self.model.tags
+
+    @property
+    def priority(self) -> str:
+        return self.model.priority
+
+    @property
+    def async_store(self) -> "AsyncDataStore":
+        return self.list.async_store
+
+    def label_text(self):
+        if self.tags:
+            return f"{self.item_text} [Tags: {', '.join(self.tags)}]"
+        return self.item_text
+
+    def open_menu(self, e):
+        self.list.open_card_menu(self)
+
     def edit_item(self, e):
+        self.edit_field = ft.Row(
+            [
+                ft.TextField(
+                    value=self.item_text,
+                    width=150,
+                    height=40,
+                    content_padding=ft.padding.only(left=10, bottom=10),
+                ),
+                ft.TextButton(text="Save", on_click=self.save_item_text),
+            ]
+        )
         self.card_item.content.controls[0].content = self.edit_field
         self.card_item.content.controls[1].visible = False
         self.update()
 
-    def save_item_text(self, e):
-        self.item_text = self.edit_field.controls[0].value
-        self.checkbox.label = self.item_text
+    async def save_item_text(self, e):
+        await self.async_store.update_item(
+            self.model, {"item_text": self.edit_field.controls[0].value}
+        )
+        self.edit_field = None
+        self.checkbox.label = self.label_text()
         self.card_item.content.controls[0].content = self.checkbox
         self.card_item.content.controls[1].visible = True
         self.update()
 
-    def delete_item(self, e):
-        self.list.remove_item(self)
+    @batched
+    async def delete_item(self, e):
+        await self.list.remove_item(self)
         
     def add_tag(self, e):
-        def close_dlg(e):
+        @timed
+        async def close_dlg(e):
             if (hasattr(e.control, "text") and not e.control.text == "Cancel") or (
                 type(e.control) is ft.TextField and e.control.value != ""
             ):
                 tag = tag_text.value.strip()
                 if tag and tag not in self.tags:
-                    self.tags.append(tag)
+                    await self.async_store.update_item(
+                        self.model, {"tags": self.tags + [tag]}
+                    )
+                    self.list.board.tag_index.add_tag(self.item_id, tag)
                     self.update_tag_display()
             self.page.close(dialog)
             
@@ -187,14 +215,11 @@ class Item(ft.Container):
         tag_text.focus()
         
     def update_tag_display(self):
-        if self.tags:
-            tags_text = ", ".join(self.tags)
-            self.checkbox.label = f"{self.item_text} [Tags: {tags_text}]"
-        else:
-            self.checkbox.label = self.item_text
+        self.checkbox.label = self.label_text()
         self.update()
 
-    def drag_accept(self, e):
+    @batched
+    async def drag_accept(self, e):
         src = self.page.get_control(e.src_id)
 
         if src.content.content == e.control.content:
@@ -203,24 +228,18 @@ class Item(ft.Container):
             e.control.update()
             return
 
-        if src.data.list == self.list:
-            self.list.add_item(chosen_control=src.data, swap_control=self)
-            self.card_item.elevation = 1
-            e.control.update()
-            return
-
-        self.list.add_item(src.data.item_text, swap_control=self)
-        src.data.list.remove_item(src.data)
-        self.list.set_indicator_opacity(self, 0.0)
+        await self.list.add_item(chosen_control=src.data, swap_control=self)
         self.card_item.elevation = 1
         self.page.update()
 
+    @batched
     def drag_will_accept(self, e):
         if e.data == "true":
             self.list.set_indicator_opacity(self, 1.0)
         self.card_item.elevation = 20 if e.data == "true" else 1
         self.page.update()
 
+    @batched
     def drag_leave(self, e):
         self.list.set_indicator_opacity(self, 0.0)
         self.card_item.elevation = 1
@@ -234,13 +253,16 @@ class Item(ft.Container):
         else:
             return ft.colors.GREY_400
     
-    def change_priority(self, e):
+    @batched
+    async def change_priority(self, e):
         if self.priority == "normal":
-            self.priority = "high"
+            priority = "high"
         elif self.priority == "high":
-            self.priority = "low"
+            priority = "low"
         else:
-            self.priority = "normal"
+            priority = "normal"
+        await self.async_store.update_item(self.model, {"priority": priority})
+        self.list.board.tag_index.set_priority(self.item_id, priority)
         
         self.priority_indicator.bgcolor = self.get_priority_color()
         self.update()
\ No newline at end of file
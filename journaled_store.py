@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+from dataclasses import asdict
+from typing import Iterator
+
+from data_store import DataStore, DelegatingStore
+from models import BoardModel, BoardListModel, ItemModel
+from user import User
+from workspace_io import workspace_records
+
+
+def dump(record) -> bytes:
+    return json.dumps(record, separators = (",", ":")).encode() + b"\n"
+
+
+def read_records(path: str) -> Iterator[tuple[int, dict]]:
+    """Yield (end offset, record) for each complete line of a JSON Lines file.
+
+    Reading stops at the first torn or unparsable line, which is what a crash
+    in the middle of an append leaves behind.
+    """
+    if not os.path.exists(path):
+        return
+    offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return
+            offset += len(line)
+            yield offset, record
+
+
+class OperationLog:
+    """Append-only journal of store mutations with periodic compact snapshots.
+
+    Every mutation is appended as one JSON line tagged with a sequence
+    number. Once `snapshot_every` operations have piled up, the store's
+    current contents are written to a fresh snapshot (written aside, then
+    atomically renamed into place) and the log is truncated, so replay on
+    startup reads at most one snapshot plus `snapshot_every` operations. The
+    snapshot records the last sequence number it covers, so a crash between
+    the rename and the truncate never applies an operation twice, and the
+    next free id of each kind, so ids of records removed before it are not
+    handed out again.
+    """
+
+    snapshot_every = 10000
+
+    def __init__(self, directory: str, sync: bool = False):
+        os.makedirs(directory, exist_ok = True)
+        self.log_path = os.path.join(directory, "operations.jsonl")
+        self.snapshot_path = os.path.join(directory, "snapshot.jsonl")
+        # Without sync appends survive a crash of the process but not of the
+        # machine; with it every append waits for the disk.
+        self.sync = sync
+        self.seq = 0
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.file = None
+
+    def replay(self, store: DataStore):
+        """Load the snapshot and the operations after it into an empty store"""
+        for _, record in read_records(self.snapshot_path):
+            if "seq" in record:
+                self.seq = record["seq"]
+                for kind, next_id in record.get("next_ids", {}).items():
+                    # Reserve up to the mark, so ids of records removed
+                    # before the snapshot stay used.
+                    start = store.reserve_ids(kind, 0).start
+                    store.reserve_ids(kind, max(0, next_id - start))
+            else:
+                self.restore(store, record)
+        valid = 0
+        for valid, record in read_records(self.log_path):
+            if record["seq"] > self.seq:
+                self.apply(store, record["op"], record["args"])
+                self.seq = record["seq"]
+                self.pending += 1
+        self.file = open(self.log_path, "ab")
+        # Drop a torn tail so new appends start on a line boundary.
+        self.file.truncate(valid)
+
+    def restore(self, store: DataStore, record: dict):
+        if "board" in record:
+            store.add_board(BoardModel(**record["board"]))
+        elif "list" in record:
+            board_list = BoardListModel(**record["list"])
+            store.add_list(board_list.board_id, board_list)
+        elif "item" in record:
+            item = ItemModel(**record["item"])
+            store.add_item(item.board_list_id, item)
+        elif "user" in record:
+            name, password, theme = record["user"]
+            user = User(name, password)
+            user.preferences["theme"] = theme
+            store.add_user(user)
+
+    def apply(self, store: DataStore, op: str, args: list):
+        if op == "add_board":
+            store.add_board(BoardModel(**args[0]))
+        elif op == "update_board":
+            store.update_board(store.get_board(args[0]), args[1])
+        elif op == "remove_board":
+            store.remove_board(store.get_board(args[0]))
+        elif op == "add_list":
+            store.add_list(args[0], BoardListModel(**args[1]))
+        elif op == "update_list":
+            store.update_list(store.get_list(args[0]), args[1])
+        elif op == "remove_list":
+            store.remove_list(args[0], args[1])
+        elif op == "add_item":
+            store.add_item(args[0], ItemModel(**args[1]))
+        elif op == "update_item":
+            store.update_item(store.get_item(args[0]), args[1])
+        elif op == "move_item":
+            store.move_item(*args)
+        elif op == "remove_item":
+            store.remove_item(args[0], args[1])
+        elif op == "add_many":
+            store.add_many(
+                [BoardModel(**b) for b in args[0]],
+                [BoardListModel(**l) for l in args[1]],
+                [ItemModel(**i) for i in args[2]],
+            )
+        elif op == "add_user":
+            self.restore(store, {"user": args})
+        elif op == "remove_user":
+            store.remove_user(args[0])
+        else:
+            raise ValueError(f"unknown operation {op!r}")
+
+    def append(self, op: str, *args) -> bool:
+        """Journal one operation; returns True once a snapshot is due"""
+        with self.lock:
+            self.seq += 1
+            self.file.write(dump({"seq": self.seq, "op": op, "args": args}))
+            self.file.flush()
+            if self.sync:
+                os.fsync(self.file.fileno())
+            self.pending += 1
+            return self.pending >= self.snapshot_every
+
+    def snapshot(self, store: DataStore):
+        with self.lock:
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                # An empty reservation reads the next id without taking one.
+                next_ids = {
+                    kind: store.reserve_ids(kind, 0).start
+                    for kind in ("board", "list", "item")
+                }
+                f.write(dump({"seq": self.seq, "next_ids": next_ids}))
+                for record in workspace_records(store):
+                    f.write(dump(record))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            self.file.truncate(0)
+            self.file.seek(0)
+            self.pending = 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class JournaledStore(DelegatingStore):
+    """Makes any DataStore durable through an OperationLog.
+
+    The inner store starts empty and is rebuilt from the log on
+    construction; after that each mutation is applied to it and then
+    journaled, and reads go straight to it. Ids come from the inner store,
+    which the replay moves past the snapshot's marks and every id it sees.
+    """
+
+    def __init__(self, inner: DataStore, log: OperationLog):
+        super().__init__(inner)
+        self.log = log
+        log.replay(inner)
+
+    def journal(self, op: str, *args):
+        if self.log.append(op, *args):
+            self.log.snapshot(self.inner)
+
+    def close(self):
+        self.log.close()
+
+    def add_board(self, board: BoardModel):
+        self.inner.add_board(board)
+        self.journal("add_board", asdict(board))
+
+    def update_board(self, board: BoardModel, update: dict):
+        self.inner.update_board(board, update)
+        self.journal("update_board", board.board_id, update)
+
+    def remove_board(self, board: BoardModel):
+        self.inner.remove_board(board)
+        self.journal("remove_board", board.board_id)
+
+    def add_user(self, user: User):
+        self.inner.add_user(user)
+        self.journal("add_user", user.name, user.password, user.get_theme())
+
+    def remove_user(self, id: str):
+        self.inner.remove_user(id)
+        self.journal("remove_user", id)
+
+    def add_list(self, board: int, list: BoardListModel):
+        self.inner.add_list(board, list)
+        self.journal("add_list", board, asdict(list))
+
+    def update_list(self, list: BoardListModel, update: dict):
+        self.inner.update_list(list, update)
+        self.journal("update_list", list.board_list_id, update)
+
+    def remove_list(self, board: int, id: int):
+        self.inner.remove_list(board, id)
+        self.journal("remove_list", board, id)
+
+    def add_item(self, board_list: int, item: ItemModel):
+        self.inner.add_item(board_list, item)
+        self.journal("add_item", board_list, asdict(item))
+
+    def update_item(self, item: ItemModel, update: dict):
+        self.inner.update_item(item, update)
+        self.journal("update_item", item.item_id, update)
+
+    def move_item(self, item_id: int, to_list: int, index: int):
+        self.inner.move_item(item_id, to_list, index)
+        self.journal("move_item", item_id, to_list, index)
+
+    def remove_item(self, board_list: int, id: int):
+        self.inner.remove_item(board_list, id)
+        self.journal("remove_item", board_list, id)
+
+    def add_many(
+        self,
+        boards: list[BoardModel],
+        lists: list[BoardListModel],
+        items: list[ItemModel],
+    ):
+        self.inner.add_many(boards, lists, items)
+        self.journal(
+            "add_many",
+            [asdict(b) for b in boards],
+            [asdict(l) for l in lists],
+            [asdict(i) for i in items],
+        )
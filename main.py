@@ -1,16 +1,33 @@
+import atexit
+import os
+
 import flet as ft
 
 from app_layout import AppLayout
-from board import Board
+from async_store import AsyncDataStore, ThreadedStore
+from board_list import BoardList
 from user import User
 from data_store import DataStore
-from memory_store import InMemoryStore
+from models import BoardModel
+from shared_store import SharedStore
+from sqlite_store import SqliteStore
 from theme_manager import ThemeManager
+from update_audit import audit
+from write_behind_store import WriteBehindStore
+from render_batch import batched
+from metrics import InstrumentedStore, registry, timed
 
 class TrelloApp(AppLayout):
-    def __init__(self, page: ft.Page, store: DataStore):
+    def __init__(
+        self,
+        page: ft.Page,
+        store: DataStore,
+        async_store: AsyncDataStore | None = None,
+    ):
         self.page: ft.Page = page
         self.store: DataStore = store
+        # Handlers that write await this instead of blocking the event loop.
+        self.async_store: AsyncDataStore = async_store or ThreadedStore(store)
         self.user: User | None = None
         self.page.on_route_change = self.route_change
         self.boards = self.store.get_boards()
@@ -65,7 +82,17 @@ class TrelloApp(AppLayout):
             expand = True,
             vertical_alignment = ft.CrossAxisAlignment.START,
         )
+
+        self.themed_controls: list[tuple[ft.Control, str, str]] = []
+        self.register_themed(self.appbar, "bgcolor", "appbar")
+        self.register_themed(self.appbar.title, "color", "text")
+        self.register_themed(self.sidebar, "bgcolor", "sidebar")
+        self.register_themed(self.sidebar.top_nav_rail, "bgcolor", "sidebar")
+        self.register_themed(self.sidebar.bottom_nav_rail, "bgcolor", "sidebar")
+        for dest in self.sidebar.top_nav_rail.destinations:
+            self.register_themed(dest.label_content, "color", "sidebar_text")
     
+    @batched
     def toggle_theme(self, e=None):
         if self.user:
             self.current_theme = self.user.toggle_theme()
@@ -81,54 +108,21 @@ class TrelloApp(AppLayout):
         self.page.update()
     
     def apply_theme(self):
+        # Text, fields, tiles, cards and lists use the theme's color scheme
+        # (e.g. ft.Colors.SURFACE) rather than fixed colors, so a switch only
+        # touches the page and the registered chrome controls.
+        self.page.theme_mode = ThemeManager.get_theme_mode(self.current_theme)
         self.page.bgcolor = self.theme_colors["background"]
-        
-        self.appbar.bgcolor = self.theme_colors["appbar"]
-        self.appbar.title.color = self.theme_colors["text"]
-        
-        if hasattr(self, "sidebar"):
-            self.sidebar.bgcolor = self.theme_colors["sidebar"]
-            self.sidebar.top_nav_rail.bgcolor = self.theme_colors["sidebar"]
-            self.sidebar.bottom_nav_rail.bgcolor = self.theme_colors["sidebar"]
-            
-            for dest in self.sidebar.top_nav_rail.destinations:
-                if hasattr(dest, "label_content") and isinstance(dest.label_content, ft.Text):
-                    dest.label_content.color = self.theme_colors["sidebar_text"]
-            
-            for dest in self.sidebar.bottom_nav_rail.destinations:
-                if hasattr(dest, "label_content") and isinstance(dest.label_content, ft.Text):
-                    dest.label_content.color = self.theme_colors["sidebar_text"]
-        
-        if hasattr(self, "active_view") and self.active_view:
-            if isinstance(self.active_view, Board):
-                self.active_view.board_lists.bgcolor = self.theme_colors["background"]
-                
-                for control in self.active_view.board_content.controls:
-                    if isinstance(control, BoardList):
-                        if hasattr(control, "header"):
-                            for header_control in control.header.controls:
-                                if isinstance(header_control, ft.Text):
-                                    header_control.color = self.theme_colors["list_title"]
-                            
-                        for item_container in control.items.controls:
-                            if len(item_container.controls) > 1:
-                                item = item_container.controls[1]
-                                if hasattr(item, "checkbox"):
-                                    item.checkbox.label_style = ft.TextStyle(
-                                        color=self.theme_colors["item_text"]
-                                    )
-            elif self.active_view == self.all_boards_view:
-                self.all_boards_view.bgcolor = self.theme_colors["background"]
-                
-                for control in self.all_boards_view.controls:
-                    if isinstance(control, ft.Row) and len(control.controls) > 0:
-                        for row_control in control.controls:
-                            if isinstance(row_control, ft.Container) and hasattr(row_control, "content"):
-                                if isinstance(row_control.content, ft.Text):
-                                    row_control.content.color = self.theme_colors["board_text"]
+        for control, attribute, key in self.themed_controls:
+            setattr(control, attribute, self.theme_colors[key])
+
+    def register_themed(self, control: ft.Control, attribute: str, key: str):
+        self.themed_controls.append((control, attribute, key))
+        setattr(control, attribute, self.theme_colors[key])
     
     def login(self, e):
-        def close_dlg(e):
+        @timed
+        async def close_dlg(e):
             if user_name.value == "" or password.value == "":
                 user_name.error_text = "Please enter an username"
                 password.error_text = "Please enter a password"
@@ -136,10 +130,10 @@ class TrelloApp(AppLayout):
                 return
             else:
                 user = User(user_name.value, password.value)
-                if user not in self.store.get_users():
-                    self.store.add_user(user)
+                if user not in await self.async_store.get_users():
+                    await self.async_store.add_user(user)
                 self.user = user
-                self.page.client_storage.set("current_user", user_name.value)
+                await self.page.client_storage.set_async("current_user", user_name.value)
                 
                 self.current_theme = self.user.get_theme()
                 self.theme_colors = ThemeManager.get_theme_colors(self.current_theme)
@@ -148,7 +142,7 @@ class TrelloApp(AppLayout):
 
             self.page.close(dialog)
             self.appbar_items[0] = ft.PopupMenuItem(
-                text = f"{self.page.client_storage.get('current_user')}'s Profile"
+                text = f"{await self.page.client_storage.get_async('current_user')}'s Profile"
             )
             self.page.update()
 
@@ -168,15 +162,24 @@ class TrelloApp(AppLayout):
         )
         self.page.open(dialog)
 
+    def initialize(self):
+        # Resolve the route the page was opened on, so deep links work.
+        self.page.go(self.page.route)
+
+    @batched
     def route_change(self, e):
         troute = ft.TemplateRoute(self.page.route)
         if troute.match("/"):
             self.page.go("/boards")
         elif troute.match("/board/:id"):
-            if int(troute.id) > len(self.store.get_boards()):
+            # Routes carry the board id, so links stay valid when other
+            # boards are deleted.
+            try:
+                board = self.store.get_board(int(troute.id))
+            except (KeyError, ValueError):
                 self.page.go("/")
                 return
-            self.set_board_view(int(troute.id))
+            self.set_board_view(board.board_id)
         elif troute.match("/boards"):
             self.set_all_boards_view()
         elif troute.match("/members"):
@@ -184,11 +187,12 @@ class TrelloApp(AppLayout):
         self.page.update()
 
     def add_board(self, e):
-        def close_dlg(e):
+        @timed
+        async def close_dlg(e):
             if (hasattr(e.control, "text") and not e.control.text == "Cancel") or (
                 type(e.control) is ft.TextField and e.control.value != ""
             ):
-                self.create_new_board(dialog_text.value)
+                await self.create_new_board(dialog_text.value)
             self.page.close(dialog)
             self.page.update()
 
@@ -227,13 +231,14 @@ class TrelloApp(AppLayout):
         self.page.update()
         dialog_text.focus()
 
-    def create_new_board(self, board_name):
-        new_board = Board(self, self.store, board_name, self.page)
-        self.store.add_board(new_board)
+    async def create_new_board(self, board_name):
+        board_id = await self.async_store.next_id("board")
+        await self.async_store.add_board(BoardModel(board_name, board_id = board_id))
         self.hydrate_all_boards_view()
 
-    def delete_board(self, e):
-        self.store.remove_board(e.control.data)
+    async def delete_board(self, e):
+        await self.async_store.remove_board(e.control.data)
+        self.drop_board_view(e.control.data.board_id)
         self.set_all_boards_view()
 
 
@@ -242,16 +247,48 @@ def main(page: ft.Page):
     page.title = "(Not) Trello"
     page.padding = 0
     page.theme = ft.Theme(font_family = "Verdana")
+    page.dark_theme = ft.Theme(font_family = "Verdana")
     page.theme_mode = ft.ThemeMode.LIGHT
     page.theme.page_transitions.windows = "cupertino"
     page.fonts = {"Helvetica": "Helvetica.ttf"}
     page.bgcolor = ft.Colors.GREY_200
-    app = TrelloApp(page, InMemoryStore())
+    if registry.enabled:
+        registry.watch_page(page)
+    app = TrelloApp(page, workspace.session())
     page.add(app)
     page.update()
     app.initialize()
 
 
-print("flet version: ", ft.version.version)
-print("flet path: ", ft.__file__)
-ft.app(target = main, assets_dir = "../assets")
+if __name__ == "__main__":
+    # Edits are written to the database in batches, and once more on exit.
+    store = WriteBehindStore(SqliteStore("trello.db"))
+    atexit.register(store.close)
+
+    # Metrics are opt-in: set a port to scrape them, a path to dump them, or both.
+    metrics_port = os.environ.get("TRELLO_METRICS_PORT")
+    metrics_dump = os.environ.get("TRELLO_METRICS_DUMP")
+    if metrics_port or metrics_dump:
+        registry.enable()
+        store = InstrumentedStore(store)
+        if metrics_port:
+            registry.serve(int(metrics_port))
+        if metrics_dump:
+            registry.dump_every(
+                metrics_dump, float(os.environ.get("TRELLO_METRICS_INTERVAL", "60"))
+            )
+    # Every session of the process works on the same boards; each gets its own
+    # handle so it is told about the others' changes but not its own.
+    workspace = SharedStore(store)
+
+    if os.environ.get("TRELLO_COMPACT_CARDS"):
+        BoardList.compact_cards = True
+
+    # Debug mode: account for every page update and report the largest on exit.
+    if os.environ.get("TRELLO_UPDATE_AUDIT"):
+        audit.enable()
+        atexit.register(audit.print_report)
+
+    print("flet version: ", ft.version.version)
+    print("flet path: ", ft.__file__)
+    ft.app(target = main, assets_dir = "../assets")
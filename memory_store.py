@@ -1,68 +1,232 @@
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from board import Board
-    from board_list import BoardList
+    from models import BoardModel, BoardListModel, ItemModel
     from user import User
-    from item import Item
 
 from data_store import DataStore
+from search_index import SearchIndex
+
+
+class CardOrder:
+    """The card ids of one list in order, as a doubly linked list.
+
+    Removing a card relinks its neighbours, and inserting one at an index
+    walks to it from the nearer end, so neither copies the list.
+    """
+
+    __slots__ = ("first", "last", "prev", "next")
+
+    def __init__(self):
+        self.first: int | None = None
+        self.last: int | None = None
+        self.prev: dict[int, int | None] = {}
+        self.next: dict[int, int | None] = {}
+
+    def __len__(self):
+        return len(self.prev)
+
+    def __contains__(self, id: int):
+        return id in self.prev
+
+    def __iter__(self):
+        id = self.first
+        while id is not None:
+            yield id
+            id = self.next[id]
+
+    def append(self, id: int):
+        self.link(id, None)
+
+    def insert(self, index: int, id: int):
+        if index >= len(self):
+            self.link(id, None)
+            return
+        if index <= len(self) // 2:
+            before = self.first
+            for _ in range(index):
+                before = self.next[before]
+        else:
+            before = self.last
+            for _ in range(len(self) - 1 - index):
+                before = self.prev[before]
+        self.link(id, before)
+
+    def link(self, id: int, before: int | None):
+        """Put `id` in front of `before`, or at the end for None"""
+        prev = self.last if before is None else self.prev[before]
+        self.prev[id] = prev
+        self.next[id] = before
+        if prev is None:
+            self.first = id
+        else:
+            self.next[prev] = id
+        if before is None:
+            self.last = id
+        else:
+            self.prev[before] = id
+
+    def remove(self, id: int):
+        prev = self.prev.pop(id)
+        next = self.next.pop(id)
+        if prev is None:
+            self.first = next
+        else:
+            self.next[prev] = next
+        if next is None:
+            self.last = prev
+        else:
+            self.prev[next] = prev
 
 
 class InMemoryStore(DataStore):
     def __init__(self):
-        self.boards: dict[int, "Board"] = {}
+        self.boards: dict[int, "BoardModel"] = {}
         self.users: dict[str, "User"] = {}
-        self.board_lists: dict[int, list["BoardList"]] = {}
-        self.items: dict[int, list["Item"]] = {}
-
-    def add_board(self, board: "Board"):
+        # Ordered per-board dicts keep insertion order and give O(1) removal.
+        self.board_lists: dict[int, dict[int, "BoardListModel"]] = {}
+        # Card ids per list in display order; removing a card and moving it
+        # between lists relink it in place.
+        self.items: dict[int, CardOrder] = {}
+        # Secondary indexes: id -> model and id -> owning parent id.
+        self.lists_by_id: dict[int, "BoardListModel"] = {}
+        self.list_board: dict[int, int] = {}
+        self.items_by_id: dict[int, "ItemModel"] = {}
+        self.item_list: dict[int, int] = {}
+        self.search_index = SearchIndex()
+        # Next free id per kind; records added with explicit ids (replays,
+        # snapshots) push it past themselves.
+        self.next_ids: dict[str, int] = {"board": 0, "list": 0, "item": 0}
+
+    def reserve_ids(self, kind: str, count: int):
+        start = self.next_ids[kind]
+        self.next_ids[kind] = start + count
+        return range(start, start + count)
+
+    def claim_id(self, kind: str, id: int):
+        if id >= self.next_ids[kind]:
+            self.next_ids[kind] = id + 1
+
+    def add_board(self, board: "BoardModel"):
+        self.claim_id("board", board.board_id)
         self.boards[board.board_id] = board
+        self.search_index.add_board(board)
 
     def get_board(self, id: int):
         return self.boards[id]
 
-    def update_board(self, board: "Board", update: dict):
+    def update_board(self, board: "BoardModel", update: dict):
         for k in update:
             setattr(board, k, update[k])
+        self.search_index.add_board(board)
 
     def get_boards(self):
-        return [self.boards[b] for b in self.boards]
+        return list(self.boards.values())
 
-    def remove_board(self, board: "Board"):
+    def remove_board(self, board: "BoardModel"):
         del self.boards[board.board_id]
-        self.board_lists[board.board_id] = []
+        for list_id in list(self.board_lists.get(board.board_id, {})):
+            self.remove_list(board.board_id, list_id)
+        self.board_lists.pop(board.board_id, None)
+        self.search_index.remove("board", board.board_id)
 
-    def add_list(self, board: int, list: "BoardList"):
-        if board in self.board_lists:
-            self.board_lists[board].append(list)
-        else:
-            self.board_lists[board] = [list]
+    def add_list(self, board: int, list: "BoardListModel"):
+        self.claim_id("list", list.board_list_id)
+        self.board_lists.setdefault(board, {})[list.board_list_id] = list
+        self.lists_by_id[list.board_list_id] = list
+        self.list_board[list.board_list_id] = board
+        self.search_index.add_list(list)
+
+    def get_lists(self):
+        return list(self.lists_by_id.values())
+
+    def get_list(self, id: int):
+        return self.lists_by_id[id]
 
     def get_lists_by_board(self, board: int):
-        return self.board_lists.get(board, [])
+        return list(self.board_lists.get(board, {}).values())
+
+    def update_list(self, list: "BoardListModel", update: dict):
+        for k in update:
+            setattr(list, k, update[k])
+        self.search_index.add_list(list)
 
     def remove_list(self, board: int, id: int):
-        self.board_lists[board] = [
-            l for l in self.board_lists[board] if not l.board_list_id == id
-        ]
+        self.board_lists.get(board, {}).pop(id, None)
+        self.lists_by_id.pop(id, None)
+        self.list_board.pop(id, None)
+        self.search_index.remove("list", id)
+        for item_id in self.items.pop(id, ()):
+            del self.items_by_id[item_id]
+            del self.item_list[item_id]
+            self.search_index.remove("item", item_id)
 
     def add_user(self, user: "User"):
         self.users[user.name] = user
 
     def get_users(self):
-        return [self.users[u] for u in self.users]
+        return list(self.users.values())
 
-    def add_item(self, board_list: int, item: "Item"):
-        if board_list in self.items:
-            self.items[board_list].append(item)
-        else:
-            self.items[board_list] = [item]
+    def get_user(self, id: str):
+        return self.users[id]
+
+    def remove_user(self, id: str):
+        del self.users[id]
+
+    def add_item(self, board_list: int, item: "ItemModel"):
+        self.claim_id("item", item.item_id)
+        self.items.setdefault(board_list, CardOrder()).append(item.item_id)
+        self.items_by_id[item.item_id] = item
+        self.item_list[item.item_id] = board_list
+        self.search_index.add_item(self.list_board[board_list], item)
 
     def get_items(self, board_list: int):
-        return self.items.get(board_list, [])
+        return [self.items_by_id[id] for id in self.items.get(board_list, ())]
 
-    def remove_item(self, board_list: int, id: int):
-        self.items[board_list] = [
-            i for i in self.items[board_list] if not i.item_id == id
+    def get_item(self, id: int):
+        return self.items_by_id[id]
+
+    def get_items_by_board(self, board: int):
+        return [
+            self.items_by_id[id]
+            for list_id in self.board_lists.get(board, {})
+            for id in self.items.get(list_id, ())
         ]
+
+    def update_item(self, item: "ItemModel", update: dict):
+        for k in update:
+            setattr(item, k, update[k])
+        if item.item_id in self.item_list:
+            self.search_index.add_item(self.list_board[self.item_list[item.item_id]], item)
+
+    def move_item(self, item_id: int, to_list: int, index: int):
+        item = self.items_by_id[item_id]
+        self.items[self.item_list[item_id]].remove(item_id)
+        self.items.setdefault(to_list, CardOrder()).insert(index, item_id)
+        self.item_list[item_id] = to_list
+        item.board_list_id = to_list
+        self.search_index.add_item(self.list_board[to_list], item)
+
+    def remove_item(self, board_list: int, id: int):
+        if self.item_list.get(id) != board_list:
+            return
+        self.items[board_list].remove(id)
+        del self.items_by_id[id]
+        del self.item_list[id]
+        self.search_index.remove("item", id)
+
+    def add_many(
+        self,
+        boards: list["BoardModel"],
+        lists: list["BoardListModel"],
+        items: list["ItemModel"],
+    ):
+        for board in boards:
+            self.add_board(board)
+        for board_list in lists:
+            self.add_list(board_list.board_id, board_list)
+        for item in items:
+            self.add_item(item.board_list_id, item)
+
+    def search(self, query: str, limit: int = 10):
+        return self.search_index.search(query, limit)
@@ -0,0 +1,275 @@
+import bisect
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from data_store import DataStore, DelegatingStore
+
+SECONDS_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+BYTES_BUCKETS = (0, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# family -> (label name, buckets, help text)
+HISTOGRAMS = {
+    "handler_seconds": ("handler", SECONDS_BUCKETS, "Event handler latency"),
+    "store_seconds": ("method", SECONDS_BUCKETS, "DataStore call latency"),
+    "interaction_page_updates": (
+        "handler", COUNT_BUCKETS, "page.update() calls sent per interaction"
+    ),
+    "interaction_update_bytes": (
+        "handler", BYTES_BUCKETS, "Serialized update bytes sent per interaction"
+    ),
+}
+COUNTERS = {
+    "page_updates_total": "page.update() calls sent to clients",
+    "update_bytes_total": "Serialized update bytes sent to clients",
+}
+
+
+def encoded_size(commands) -> int:
+    """Size of page commands as they are serialized for the client"""
+    from flet.core.protocol import CommandEncoder
+
+    return len(json.dumps(commands, cls = CommandEncoder, separators = (",", ":")))
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[int]:
+        total, out = 0, []
+        for count in self.counts:
+            total += count
+            out.append(total)
+        return out
+
+
+@dataclass(slots = True)
+class Interaction:
+    updates: int = 0
+    bytes: int = 0
+
+
+def label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Opt-in counters and latency histograms for the app's hot paths.
+
+    Nothing is recorded until `enable()` is called, and until then the
+    decorators cost one flag check per call. An interaction is the
+    outermost timed handler in a thread or task: the page updates it sends
+    and their serialized size are attributed to it.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.histograms: dict[tuple[str, str], Histogram] = {}
+        self.counters: dict[str, float] = dict.fromkeys(COUNTERS, 0)
+        self.lock = threading.Lock()
+        self.current: ContextVar[Interaction | None] = ContextVar(
+            "metrics_interaction", default = None
+        )
+
+    def enable(self):
+        self.enabled = True
+
+    def observe(self, family: str, label: str, value: float):
+        with self.lock:
+            histogram = self.histograms.get((family, label))
+            if histogram is None:
+                histogram = Histogram(HISTOGRAMS[family][1])
+                self.histograms[(family, label)] = histogram
+            histogram.observe(value)
+
+    def inc(self, counter: str, value: float = 1):
+        with self.lock:
+            self.counters[counter] += value
+
+    @contextmanager
+    def interaction(self, name: str):
+        # A context variable rather than a thread-local, so async handlers
+        # interleaved on one event loop each count their own updates.
+        token = None
+        interaction = self.current.get()
+        if interaction is None:
+            interaction = Interaction()
+            token = self.current.set(interaction)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("handler_seconds", name, time.perf_counter() - start)
+            if token is not None:
+                self.current.reset(token)
+                self.observe("interaction_page_updates", name, interaction.updates)
+                self.observe("interaction_update_bytes", name, interaction.bytes)
+
+    def count_update(self):
+        if self.enabled:
+            self.inc("page_updates_total")
+            interaction = self.current.get()
+            if interaction is not None:
+                interaction.updates += 1
+
+    def count_bytes(self, size: int):
+        if self.enabled:
+            self.inc("update_bytes_total", size)
+            interaction = self.current.get()
+            if interaction is not None:
+                interaction.bytes += size
+
+    def watch_page(self, page):
+        """Count the serialized size of every update sent for `page`"""
+        connection = getattr(page, "_Page__conn", None)
+        if connection is None or getattr(connection, "metrics_watched", False):
+            return
+        send_commands = connection.send_commands
+
+        def counted_send_commands(session_id, commands):
+            self.count_bytes(encoded_size(commands))
+            return send_commands(session_id, commands)
+
+        connection.send_commands = counted_send_commands
+        connection.metrics_watched = True
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            histograms = {}
+            for (family, label), h in sorted(self.histograms.items()):
+                histograms.setdefault(family, {})[label] = {
+                    "count": h.count,
+                    "sum": h.sum,
+                    "buckets": dict(zip(map(str, h.buckets), h.cumulative())),
+                }
+            return {"counters": dict(self.counters), "histograms": histograms}
+
+    def prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            for name, help in COUNTERS.items():
+                lines.append(f"# HELP trello_{name} {help}")
+                lines.append(f"# TYPE trello_{name} counter")
+                lines.append(f"trello_{name} {self.counters[name]}")
+            for family, (label, _, help) in HISTOGRAMS.items():
+                lines.append(f"# HELP trello_{family} {help}")
+                lines.append(f"# TYPE trello_{family} histogram")
+                for (f, value), h in sorted(self.histograms.items()):
+                    if f != family:
+                        continue
+                    labels = f'{label}="{label_value(value)}"'
+                    for bound, count in zip(h.buckets, h.cumulative()):
+                        lines.append(f'trello_{family}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'trello_{family}_bucket{{{labels},le="+Inf"}} {h.count}')
+                    lines.append(f"trello_{family}_sum{{{labels}}} {h.sum}")
+                    lines.append(f"trello_{family}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Expose the metrics as Prometheus text on http://host:port/metrics"""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target = server.serve_forever, daemon = True).start()
+        return server
+
+    def dump_every(self, path: str, interval: float = 60.0):
+        """Rewrite `path` with a JSON snapshot every `interval` seconds"""
+
+        def dump():
+            while True:
+                time.sleep(interval)
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self.snapshot(), f, indent = 2)
+                os.replace(tmp_path, path)
+
+        threading.Thread(target = dump, daemon = True).start()
+
+
+registry = MetricsRegistry()
+
+
+def timed(handler):
+    """Record the latency of a handler as one interaction when metrics are on"""
+    name = handler.__qualname__
+
+    if inspect.iscoroutinefunction(handler):
+
+        @functools.wraps(handler)
+        async def async_wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return await handler(*args, **kwargs)
+            with registry.interaction(name):
+                return await handler(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        if not registry.enabled:
+            return handler(*args, **kwargs)
+        with registry.interaction(name):
+            return handler(*args, **kwargs)
+
+    return wrapper
+
+
+def timed_store_method(name: str):
+    def method(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return getattr(self.inner, name)(*args, **kwargs)
+        finally:
+            registry.observe("store_seconds", name, time.perf_counter() - start)
+
+    method.__name__ = method.__qualname__ = name
+    return method
+
+
+def instrument_store_methods(cls):
+    for name in vars(DataStore):
+        if not name.startswith("_"):
+            setattr(cls, name, timed_store_method(name))
+    return cls
+
+
+@instrument_store_methods
+class InstrumentedStore(DelegatingStore):
+    """Records the latency of every DataStore call made through it"""
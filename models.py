@@ -0,0 +1,30 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class BoardModel:
+    """Plain record for a board; the Flet view is built from it on demand"""
+
+    name: str
+    board_id: int = field(kw_only=True)
+
+
+@dataclass(slots=True)
+class BoardListModel:
+    """Plain record for a list on a board"""
+
+    board_id: int
+    title: str
+    color: str = ""
+    board_list_id: int = field(kw_only=True)
+
+
+@dataclass(slots=True)
+class ItemModel:
+    """Plain record for a card in a list"""
+
+    board_list_id: int
+    item_text: str
+    tags: list[str] = field(default_factory=list)
+    priority: str = "normal"
+    item_id: int = field(kw_only=True)
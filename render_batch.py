@@ -0,0 +1,111 @@
+import functools
+import inspect
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+import flet as ft
+
+from metrics import registry, timed
+from update_audit import audit
+
+
+@dataclass(slots = True)
+class BatchState:
+    full: bool = False
+    dirty: dict[int, ft.Control] = field(default_factory = dict)
+
+
+class RenderBatch:
+    """Coalesces the page updates of one interaction into a single diff.
+
+    Once installed it stands in for `page.update`, which `Control.update()`
+    also goes through. Outside a batch, updates pass straight through. Inside
+    `batch()` the requested controls are only recorded, and when the
+    outermost batch closes they are sent in one `page.update()`. Batches are
+    tracked in a context variable: Flet runs sync handlers on their own
+    threads and async handlers as their own tasks, and each keeps its own
+    batch even while an async handler is suspended.
+    """
+
+    def __init__(self, page: ft.Page):
+        self.page = page
+        self.page_update = page.update
+        self.state: ContextVar[BatchState | None] = ContextVar(
+            "render_batch", default = None
+        )
+        page.update = self.update
+        page.render_batch = self
+
+    def update(self, *controls):
+        state = self.state.get()
+        if state is None:
+            self.send(*controls)
+        elif not controls or self.page in controls:
+            state.full = True
+        else:
+            state.dirty.update((id(c), c) for c in controls)
+
+    @contextmanager
+    def batch(self):
+        state = self.state.get()
+        token = None
+        if state is None:
+            state = BatchState()
+            token = self.state.set(state)
+        try:
+            yield self
+        finally:
+            if token is not None:
+                self.state.reset(token)
+                self.flush(state)
+
+    def flush(self, state: BatchState):
+        if state.full:
+            self.send()
+        else:
+            controls = [c for c in state.dirty.values() if c.page is not None]
+            if controls:
+                self.send(*controls)
+
+    def send(self, *controls):
+        registry.count_update()
+        if audit.enabled:
+            with audit.update(self.page, controls):
+                self.page_update(*controls)
+        else:
+            self.page_update(*controls)
+
+
+def batched(handler):
+    """Run an event handler inside its page's render batch, timed as one
+    interaction when metrics are enabled"""
+
+    if inspect.iscoroutinefunction(handler):
+
+        @functools.wraps(handler)
+        async def async_wrapper(self, *args, **kwargs):
+            render_batch = getattr(self.page, "render_batch", None)
+            if render_batch is None:
+                return await handler(self, *args, **kwargs)
+            if audit.enabled:
+                with audit.origin(handler.__qualname__), render_batch.batch():
+                    return await handler(self, *args, **kwargs)
+            with render_batch.batch():
+                return await handler(self, *args, **kwargs)
+
+        return timed(async_wrapper)
+
+    @functools.wraps(handler)
+    def wrapper(self, *args, **kwargs):
+        render_batch = getattr(self.page, "render_batch", None)
+        if render_batch is None:
+            return handler(self, *args, **kwargs)
+        if audit.enabled:
+            # The origin encloses the batch so the flush is attributed too.
+            with audit.origin(handler.__qualname__), render_batch.batch():
+                return handler(self, *args, **kwargs)
+        with render_batch.batch():
+            return handler(self, *args, **kwargs)
+
+    return timed(wrapper)
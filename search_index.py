@@ -0,0 +1,110 @@
+import bisect
+import heapq
+import math
+import re
+from dataclasses import dataclass
+
+from models import BoardModel, BoardListModel, ItemModel
+
+TOKEN = re.compile(r"\w+")
+
+# Matches on a board name outrank list titles, which outrank card text.
+KIND_WEIGHTS = {"board": 3.0, "list": 2.0, "item": 1.0}
+
+
+@dataclass(slots=True)
+class SearchHit:
+    kind: str
+    id: int
+    board_id: int
+    text: str
+    score: float
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN.findall(text.lower())
+
+
+class SearchIndex:
+    """Incremental full-text index over boards, lists and cards.
+
+    Documents are keyed by (kind, id) and map every token to the documents
+    containing it, so a query only touches the postings of its own tokens.
+    All tokens must match; the last one also matches as a prefix so results
+    follow the user while they type. Hits are ranked by tf-idf weighted by
+    kind.
+    """
+
+    def __init__(self):
+        self.postings: dict[str, dict[tuple[str, int], int]] = {}
+        self.vocabulary: list[str] = []
+        self.docs: dict[tuple[str, int], tuple[int, str, set[str]]] = {}
+
+    def add(self, kind: str, id: int, board_id: int, text: str):
+        key = (kind, id)
+        self.remove(kind, id)
+        counts: dict[str, int] = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                bisect.insort(self.vocabulary, token)
+            self.postings[token][key] = count
+        self.docs[key] = (board_id, text, set(counts))
+
+    def remove(self, kind: str, id: int):
+        doc = self.docs.pop((kind, id), None)
+        if doc is None:
+            return
+        for token in doc[2]:
+            postings = self.postings[token]
+            del postings[(kind, id)]
+            if not postings:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def add_board(self, board: BoardModel):
+        self.add("board", board.board_id, board.board_id, board.name)
+
+    def add_list(self, board_list: BoardListModel):
+        self.add("list", board_list.board_list_id, board_list.board_id, board_list.title)
+
+    def add_item(self, board_id: int, item: ItemModel):
+        self.add("item", item.item_id, board_id, " ".join([item.item_text, *item.tags]))
+
+    def prefixed(self, prefix: str) -> list[str]:
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff")
+        return self.vocabulary[start:end]
+
+    def search(self, query: str, limit: int = 10) -> list[SearchHit]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        total = len(self.docs)
+        scores: dict[tuple[str, int], float] | None = None
+        for i, token in enumerate(tokens):
+            candidates = self.prefixed(token) if i == len(tokens) - 1 else [token]
+            token_scores: dict[tuple[str, int], float] = {}
+            for candidate in candidates:
+                postings = self.postings.get(candidate, {})
+                idf = math.log(1 + total / len(postings)) if postings else 0.0
+                for key, count in postings.items():
+                    token_scores[key] = token_scores.get(key, 0.0) + count * idf
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {k: v + token_scores[k] for k, v in scores.items() if k in token_scores}
+            if not scores:
+                return []
+        best = heapq.nlargest(
+            limit, scores.items(), key = lambda kv: kv[1] * KIND_WEIGHTS[kv[0][0]]
+        )
+        return [
+            SearchHit(
+                kind, id, self.docs[(kind, id)][0], self.docs[(kind, id)][1],
+                score * KIND_WEIGHTS[kind],
+            )
+            for (kind, id), score in best
+        ]
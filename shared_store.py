@@ -0,0 +1,198 @@
+import threading
+
+from change_feed import WORKSPACE, Change, ChangeFeed
+from data_store import DataStore, DelegatingStore
+from models import BoardModel, BoardListModel, ItemModel
+from user import User
+
+
+class SharedStore(DelegatingStore):
+    """One store shared by every session in the process.
+
+    Calls are serialized with a lock, and every mutation is published on
+    the change feed once the lock is released: board-level changes on
+    WORKSPACE, everything inside a board on its board id. Each session
+    works through its own `session()` handle, which is stamped on the
+    changes it makes so it can skip its own echoes.
+    """
+
+    def __init__(
+        self,
+        inner: DataStore,
+        feed: ChangeFeed | None = None,
+        lock: "threading.RLock | None" = None,
+    ):
+        super().__init__(inner)
+        self.feed = feed or ChangeFeed()
+        self.lock = lock or threading.RLock()
+
+    def session(self) -> "SharedStore":
+        return SharedStore(self.inner, self.feed, self.lock)
+
+    def publish(self, topic, kind: str, action: str, id: int, board_id: int, **kwargs):
+        self.feed.publish(
+            topic, Change(kind, action, id, board_id, origin = self, **kwargs)
+        )
+
+    def subscribe(self, topic, callback):
+        return self.feed.subscribe(topic, callback)
+
+    def unsubscribe(self, token):
+        self.feed.unsubscribe(token)
+
+    def add_board(self, board: BoardModel):
+        with self.lock:
+            self.inner.add_board(board)
+        self.publish(
+            WORKSPACE, "board", "add", board.board_id, board.board_id, model = board
+        )
+
+    def get_board(self, id: int):
+        with self.lock:
+            return self.inner.get_board(id)
+
+    def get_boards(self):
+        with self.lock:
+            return self.inner.get_boards()
+
+    def update_board(self, board: BoardModel, update: dict):
+        with self.lock:
+            self.inner.update_board(board, update)
+        self.publish(
+            WORKSPACE, "board", "update", board.board_id, board.board_id, model = board
+        )
+
+    def remove_board(self, board: BoardModel):
+        with self.lock:
+            self.inner.remove_board(board)
+        self.publish(WORKSPACE, "board", "remove", board.board_id, board.board_id)
+
+    def add_user(self, user: User):
+        with self.lock:
+            self.inner.add_user(user)
+
+    def get_users(self):
+        with self.lock:
+            return self.inner.get_users()
+
+    def get_user(self, id: str):
+        with self.lock:
+            return self.inner.get_user(id)
+
+    def remove_user(self, id: str):
+        with self.lock:
+            self.inner.remove_user(id)
+
+    def add_list(self, board: int, list: BoardListModel):
+        with self.lock:
+            self.inner.add_list(board, list)
+        self.publish(board, "list", "add", list.board_list_id, board, model = list)
+
+    def get_lists(self):
+        with self.lock:
+            return self.inner.get_lists()
+
+    def get_list(self, id: int):
+        with self.lock:
+            return self.inner.get_list(id)
+
+    def get_lists_by_board(self, board: int):
+        with self.lock:
+            return self.inner.get_lists_by_board(board)
+
+    def update_list(self, list: BoardListModel, update: dict):
+        with self.lock:
+            self.inner.update_list(list, update)
+        self.publish(
+            list.board_id, "list", "update", list.board_list_id, list.board_id, model = list
+        )
+
+    def remove_list(self, board: int, id: int):
+        with self.lock:
+            self.inner.remove_list(board, id)
+        self.publish(board, "list", "remove", id, board)
+
+    def add_item(self, board_list: int, item: ItemModel):
+        with self.lock:
+            self.inner.add_item(board_list, item)
+            board = self.inner.get_list(board_list).board_id
+        self.publish(
+            board, "item", "add", item.item_id, board, list_id = board_list, model = item
+        )
+
+    def get_items(self, board_list: int):
+        with self.lock:
+            return self.inner.get_items(board_list)
+
+    def iter_items(self, board_list: int):
+        with self.lock:
+            return self.inner.iter_items(board_list)
+
+    def get_item(self, id: int):
+        with self.lock:
+            return self.inner.get_item(id)
+
+    def get_items_by_board(self, board: int):
+        with self.lock:
+            return self.inner.get_items_by_board(board)
+
+    def update_item(self, item: ItemModel, update: dict):
+        with self.lock:
+            self.inner.update_item(item, update)
+            board = self.inner.get_list(item.board_list_id).board_id
+        self.publish(
+            board,
+            "item",
+            "update",
+            item.item_id,
+            board,
+            list_id = item.board_list_id,
+            model = item,
+        )
+
+    def move_item(self, item_id: int, to_list: int, index: int):
+        with self.lock:
+            self.inner.move_item(item_id, to_list, index)
+            board = self.inner.get_list(to_list).board_id
+            item = self.inner.get_item(item_id)
+        self.publish(
+            board,
+            "item",
+            "move",
+            item_id,
+            board,
+            list_id = to_list,
+            index = index,
+            model = item,
+        )
+
+    def remove_item(self, board_list: int, id: int):
+        with self.lock:
+            board = self.inner.get_list(board_list).board_id
+            self.inner.remove_item(board_list, id)
+        self.publish(board, "item", "remove", id, board, list_id = board_list)
+
+    def add_many(
+        self,
+        boards: list[BoardModel],
+        lists: list[BoardListModel],
+        items: list[ItemModel],
+    ):
+        with self.lock:
+            self.inner.add_many(boards, lists, items)
+        for board in boards:
+            self.publish(
+                WORKSPACE, "board", "add", board.board_id, board.board_id, model = board
+            )
+
+    def next_id(self, kind: str):
+        with self.lock:
+            return self.inner.next_id(kind)
+
+    def reserve_ids(self, kind: str, count: int):
+        with self.lock:
+            return self.inner.reserve_ids(kind, count)
+
+    def search(self, query: str, limit: int = 10):
+        with self.lock:
+            return self.inner.search(query, limit)
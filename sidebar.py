@@ -1,5 +1,7 @@
 import flet as ft
 from data_store import DataStore
+from models import BoardModel
+from render_batch import batched
 
 
 class Sidebar(ft.Container):
@@ -8,6 +10,11 @@ class Sidebar(ft.Container):
         self.store: DataStore = store
         self.app_layout = app_layout
         self.nav_rail_visible = True
+        self.board_destinations: dict[int, ft.NavigationRailDestination] = {}
+        # Board id <-> position in the bottom rail, rebuilt only when the set
+        # of boards changes.
+        self.board_ids: list[int] = []
+        self.board_index: dict[int, int] = {}
         self.top_nav_items = [
             ft.NavigationRailDestination(
                 label_content = ft.Text("Boards"),
@@ -78,50 +85,70 @@ class Sidebar(ft.Container):
             visible = self.nav_rail_visible,
         )
 
-    def sync_board_destinations(self):
-        boards = self.store.get_boards()
-        self.bottom_nav_rail.destinations = []
-        for i in range(len(boards)):
-            b = boards[i]
-            self.bottom_nav_rail.destinations.append(
-                ft.NavigationRailDestination(
-                    label_content = ft.TextField(
-                        value = b.name,
-                        hint_text = b.name,
-                        text_size = 12,
-                        read_only = True,
-                        on_focus = self.board_name_focus,
-                        on_blur = self.board_name_blur,
-                        border = ft.InputBorder.NONE,
-                        height = 50,
-                        width = 150,
-                        text_align = ft.TextAlign.START,
-                        data = i,
-                    ),
-                    label = b.name,
-                    selected_icon = ft.Icons.CHEVRON_RIGHT_ROUNDED,
-                    icon = ft.Icons.CHEVRON_RIGHT_OUTLINED,
-                )
-            )
+    def sync_board_destinations(self, boards: list[BoardModel] | None = None):
+        # Destinations are keyed by board id and reused, so only boards that
+        # were added, removed or renamed since the last sync cost anything.
+        destinations = {}
+        for b in self.store.get_boards() if boards is None else boards:
+            destination = self.board_destinations.get(b.board_id)
+            if destination is None:
+                destination = self.board_destination(b)
+            elif destination.label != b.name:
+                destination.label = b.name
+                destination.label_content.value = b.name
+                destination.label_content.hint_text = b.name
+            destinations[b.board_id] = destination
+        if destinations.keys() != self.board_destinations.keys():
+            self.bottom_nav_rail.destinations = list(destinations.values())
+            self.board_ids = list(destinations)
+            self.board_index = {id: i for i, id in enumerate(self.board_ids)}
+        self.board_destinations = destinations
+
+    def index_of(self, board_id: int) -> int | None:
+        return self.board_index.get(board_id)
+
+    def board_destination(self, b: BoardModel):
+        return ft.NavigationRailDestination(
+            label_content = ft.TextField(
+                value = b.name,
+                hint_text = b.name,
+                text_size = 12,
+                read_only = True,
+                on_focus = self.board_name_focus,
+                on_blur = self.board_name_blur,
+                border = ft.InputBorder.NONE,
+                height = 50,
+                width = 150,
+                text_align = ft.TextAlign.START,
+                data = b.board_id,
+            ),
+            label = b.name,
+            selected_icon = ft.Icons.CHEVRON_RIGHT_ROUNDED,
+            icon = ft.Icons.CHEVRON_RIGHT_OUTLINED,
+        )
 
     def toggle_nav_rail(self, e):
         self.visible = not self.visible
         self.page.update()
 
+    @batched
     def board_name_focus(self, e):
         e.control.read_only = False
         e.control.border = ft.InputBorder.OUTLINE
         self.page.update()
 
-    def board_name_blur(self, e):
-        self.store.update_board(
-            self.store.get_boards()[e.control.data], {"name": e.control.value}
+    @batched
+    async def board_name_blur(self, e):
+        store = self.app_layout.async_store
+        await store.update_board(
+            await store.get_board(e.control.data), {"name": e.control.value}
         )
         self.app_layout.hydrate_all_boards_view()
         e.control.read_only = True
         e.control.border = ft.InputBorder.NONE
         self.page.update()
 
+    @batched
     def top_nav_change(self, e):
         index = e if (type(e) == int) else e.control.selected_index
         self.bottom_nav_rail.selected_index = None
@@ -132,9 +159,13 @@ class Sidebar(ft.Container):
             self.page.route = "/members"
         self.page.update()
 
+    @batched
     def bottom_nav_change(self, e):
-        index = e if (type(e) == int) else e.control.selected_index
+        self.open_board(self.board_ids[e.control.selected_index])
+
+    @batched
+    def open_board(self, board_id: int):
         self.top_nav_rail.selected_index = None
-        self.bottom_nav_rail.selected_index = index
-        self.page.route = f"/board/{index}"
+        self.bottom_nav_rail.selected_index = self.index_of(board_id)
+        self.page.route = f"/board/{board_id}"
         self.page.update()
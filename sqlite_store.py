@@ -0,0 +1,458 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from data_store import DataStore
+from models import BoardModel, BoardListModel, ItemModel
+from search_index import SearchIndex
+from user import User
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS boards (
+    board_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS board_lists (
+    board_list_id INTEGER PRIMARY KEY,
+    board_id INTEGER NOT NULL REFERENCES boards(board_id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    color TEXT NOT NULL DEFAULT '',
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS board_lists_by_board ON board_lists(board_id, position);
+CREATE TABLE IF NOT EXISTS items (
+    item_id INTEGER PRIMARY KEY,
+    board_list_id INTEGER NOT NULL REFERENCES board_lists(board_list_id) ON DELETE CASCADE,
+    item_text TEXT NOT NULL,
+    tags TEXT NOT NULL DEFAULT '[]',
+    priority TEXT NOT NULL DEFAULT 'normal',
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_by_list ON items(board_list_id, position);
+CREATE TABLE IF NOT EXISTS users (
+    name TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    theme TEXT NOT NULL DEFAULT 'light'
+);
+CREATE TABLE IF NOT EXISTS id_sequences (
+    kind TEXT PRIMARY KEY,
+    next_id INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO id_sequences (kind, next_id)
+SELECT 'board', COALESCE(MAX(board_id) + 1, 0) FROM boards;
+INSERT OR IGNORE INTO id_sequences (kind, next_id)
+SELECT 'list', COALESCE(MAX(board_list_id) + 1, 0) FROM board_lists;
+INSERT OR IGNORE INTO id_sequences (kind, next_id)
+SELECT 'item', COALESCE(MAX(item_id) + 1, 0) FROM items;
+"""
+
+INSERT_BOARD = "INSERT INTO boards (board_id, name) VALUES (?, ?)"
+SELECT_BOARD = "SELECT board_id, name FROM boards WHERE board_id = ?"
+SELECT_BOARDS = "SELECT board_id, name FROM boards ORDER BY board_id"
+DELETE_BOARD = "DELETE FROM boards WHERE board_id = ?"
+
+LIST_COLUMNS = "board_list_id, board_id, title, color"
+INSERT_LIST = """
+INSERT INTO board_lists (board_list_id, board_id, title, color, position)
+VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(position) + 1, 0) FROM board_lists WHERE board_id = ?))
+"""
+SELECT_LIST = f"SELECT {LIST_COLUMNS} FROM board_lists WHERE board_list_id = ?"
+SELECT_LISTS = f"SELECT {LIST_COLUMNS} FROM board_lists ORDER BY board_id, position"
+SELECT_LISTS_BY_BOARD = (
+    f"SELECT {LIST_COLUMNS} FROM board_lists WHERE board_id = ? ORDER BY position"
+)
+SELECT_LIST_IDS_BY_BOARD = "SELECT board_list_id FROM board_lists WHERE board_id = ?"
+DELETE_LIST = "DELETE FROM board_lists WHERE board_id = ? AND board_list_id = ?"
+
+ITEM_COLUMNS = "items.item_id, items.board_list_id, items.item_text, items.tags, items.priority"
+INSERT_ITEM = """
+INSERT INTO items (item_id, board_list_id, item_text, tags, priority, position)
+VALUES (?, ?, ?, ?, ?, (SELECT COALESCE(MAX(position) + 1, 0) FROM items WHERE board_list_id = ?))
+"""
+SELECT_ITEM = f"SELECT {ITEM_COLUMNS} FROM items WHERE item_id = ?"
+SELECT_ITEMS_BY_LIST = (
+    f"SELECT {ITEM_COLUMNS} FROM items WHERE board_list_id = ? ORDER BY position"
+)
+SELECT_ITEMS_BY_BOARD = f"""
+SELECT {ITEM_COLUMNS} FROM items
+JOIN board_lists ON board_lists.board_list_id = items.board_list_id
+WHERE board_lists.board_id = ?
+ORDER BY board_lists.position, items.position
+"""
+SELECT_ITEM_IDS_BY_LIST = "SELECT item_id FROM items WHERE board_list_id = ?"
+SELECT_ITEM_POSITION = """
+SELECT position FROM items WHERE board_list_id = ? AND item_id != ?
+ORDER BY position LIMIT 1 OFFSET ?
+"""
+SELECT_NEXT_ITEM_POSITION = (
+    "SELECT COALESCE(MAX(position) + 1, 0) FROM items WHERE board_list_id = ?"
+)
+SHIFT_ITEMS = (
+    "UPDATE items SET position = position + 1 WHERE board_list_id = ? AND position >= ?"
+)
+MOVE_ITEM = "UPDATE items SET board_list_id = ?, position = ? WHERE item_id = ?"
+DELETE_ITEM = "DELETE FROM items WHERE board_list_id = ? AND item_id = ?"
+SELECT_ITEM_DOCUMENTS = """
+SELECT items.item_id, board_lists.board_id, items.item_text, items.tags FROM items
+JOIN board_lists ON board_lists.board_list_id = items.board_list_id
+"""
+
+UPSERT_USER = """
+INSERT INTO users (name, password, theme) VALUES (?, ?, ?)
+ON CONFLICT(name) DO UPDATE SET password = excluded.password, theme = excluded.theme
+"""
+SELECT_USER = "SELECT name, password, theme FROM users WHERE name = ?"
+SELECT_USERS = "SELECT name, password, theme FROM users ORDER BY name"
+DELETE_USER = "DELETE FROM users WHERE name = ?"
+
+RESERVE_IDS = (
+    "UPDATE id_sequences SET next_id = next_id + ? WHERE kind = ? RETURNING next_id"
+)
+CLAIM_ID = "UPDATE id_sequences SET next_id = ? + 1 WHERE kind = ? AND next_id <= ?"
+
+UPDATE_BOARD = {"name": "UPDATE boards SET name = ? WHERE board_id = ?"}
+UPDATE_LIST = {
+    "title": "UPDATE board_lists SET title = ? WHERE board_list_id = ?",
+    "color": "UPDATE board_lists SET color = ? WHERE board_list_id = ?",
+}
+UPDATE_ITEM = {
+    "item_text": "UPDATE items SET item_text = ? WHERE item_id = ?",
+    "tags": "UPDATE items SET tags = ? WHERE item_id = ?",
+    "priority": "UPDATE items SET priority = ? WHERE item_id = ?",
+}
+
+
+class SqliteStore(DataStore):
+    """DataStore persisted to an SQLite database.
+
+    The database runs in WAL mode so reads never wait on the single writer,
+    and every query is a module-level constant so the connection's statement
+    cache hands back an already prepared statement on each call. Rows are
+    turned into models once and kept in identity maps, so every view of a
+    board, list or card shares the same record.
+    """
+
+    id_block_size = 32
+
+    def __init__(self, path: str = "trello.db"):
+        self.connection = sqlite3.connect(
+            path,
+            isolation_level = None,
+            check_same_thread = False,
+            cached_statements = 256,
+        )
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+        self.boards: dict[int, BoardModel] = {}
+        self.users: dict[str, User] = {}
+        self.board_lists: dict[int, BoardListModel] = {}
+        self.items: dict[int, ItemModel] = {}
+        # Built from the rows on the first search, then kept up to date.
+        self.search_index: SearchIndex | None = None
+        # Ids are taken from the database a block at a time; ids left in a
+        # block when the process exits are skipped, never handed out twice.
+        self.id_blocks: dict[str, range] = {}
+        self.id_lock = threading.Lock()
+
+    def close(self):
+        self.connection.close()
+
+    @contextmanager
+    def transaction(self):
+        if self.connection.in_transaction:
+            # Join the enclosing transaction, which commits; a savepoint lets
+            # a failure here undo only its own writes.
+            self.connection.execute("SAVEPOINT nested")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK TO nested")
+                self.connection.execute("RELEASE nested")
+                raise
+            self.connection.execute("RELEASE nested")
+            return
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def reserve_ids(self, kind: str, count: int):
+        # A single UPDATE is atomic across every process using the file.
+        end = self.connection.execute(RESERVE_IDS, (count, kind)).fetchall()[0][0]
+        return range(end - count, end)
+
+    def claim_id(self, kind: str, id: int):
+        # Records added with ids the sequence didn't hand out (replays,
+        # copies from another store) push it past themselves.
+        self.connection.execute(CLAIM_ID, (id, kind, id))
+
+    def next_id(self, kind: str):
+        with self.id_lock:
+            block = self.id_blocks.get(kind) or self.reserve_ids(kind, self.id_block_size)
+            self.id_blocks[kind] = block[1:]
+            return block[0]
+
+    def _update(self, statements: dict[str, str], model, model_id: int, update: dict):
+        for k in update:
+            setattr(model, k, update[k])
+            if k in statements:
+                value = json.dumps(update[k]) if k == "tags" else update[k]
+                self.connection.execute(statements[k], (value, model_id))
+
+    def _board(self, row) -> BoardModel:
+        if row[0] not in self.boards:
+            self.boards[row[0]] = BoardModel(row[1], board_id = row[0])
+        return self.boards[row[0]]
+
+    def _list(self, row) -> BoardListModel:
+        if row[0] not in self.board_lists:
+            self.board_lists[row[0]] = BoardListModel(
+                row[1], row[2], row[3], board_list_id = row[0]
+            )
+        return self.board_lists[row[0]]
+
+    def _item(self, row) -> ItemModel:
+        if row[0] not in self.items:
+            self.items[row[0]] = self._new_item(row)
+        return self.items[row[0]]
+
+    def _new_item(self, row) -> ItemModel:
+        return ItemModel(row[1], row[2], json.loads(row[3]), row[4], item_id = row[0])
+
+    def _user(self, row) -> User:
+        if row[0] not in self.users:
+            user = User(row[0], row[1])
+            user.preferences["theme"] = row[2]
+            self.users[row[0]] = user
+        return self.users[row[0]]
+
+    def _one(self, sql: str, id, build):
+        row = self.connection.execute(sql, (id,)).fetchone()
+        if row is None:
+            raise KeyError(id)
+        return build(row)
+
+    def add_board(self, board: BoardModel):
+        self.connection.execute(INSERT_BOARD, (board.board_id, board.name))
+        self.claim_id("board", board.board_id)
+        self.boards[board.board_id] = board
+        if self.search_index is not None:
+            self.search_index.add_board(board)
+
+    def get_board(self, id: int):
+        if id in self.boards:
+            return self.boards[id]
+        return self._one(SELECT_BOARD, id, self._board)
+
+    def update_board(self, board: BoardModel, update: dict):
+        self._update(UPDATE_BOARD, board, board.board_id, update)
+        if self.search_index is not None:
+            self.search_index.add_board(board)
+
+    def get_boards(self):
+        return [self._board(row) for row in self.connection.execute(SELECT_BOARDS)]
+
+    def remove_board(self, board: BoardModel):
+        list_ids = [
+            row[0]
+            for row in self.connection.execute(SELECT_LIST_IDS_BY_BOARD, (board.board_id,))
+        ]
+        for list_id in list_ids:
+            self._forget_items(list_id)
+            self.board_lists.pop(list_id, None)
+            if self.search_index is not None:
+                self.search_index.remove("list", list_id)
+        self.connection.execute(DELETE_BOARD, (board.board_id,))
+        self.boards.pop(board.board_id, None)
+        if self.search_index is not None:
+            self.search_index.remove("board", board.board_id)
+
+    def add_list(self, board: int, list: BoardListModel):
+        self.connection.execute(
+            INSERT_LIST, (list.board_list_id, board, list.title, list.color, board)
+        )
+        self.claim_id("list", list.board_list_id)
+        self.board_lists[list.board_list_id] = list
+        if self.search_index is not None:
+            self.search_index.add_list(list)
+
+    def get_lists(self):
+        return [self._list(row) for row in self.connection.execute(SELECT_LISTS)]
+
+    def get_list(self, id: int):
+        if id in self.board_lists:
+            return self.board_lists[id]
+        return self._one(SELECT_LIST, id, self._list)
+
+    def get_lists_by_board(self, board: int):
+        return [
+            self._list(row)
+            for row in self.connection.execute(SELECT_LISTS_BY_BOARD, (board,))
+        ]
+
+    def update_list(self, list: BoardListModel, update: dict):
+        self._update(UPDATE_LIST, list, list.board_list_id, update)
+        if self.search_index is not None:
+            self.search_index.add_list(list)
+
+    def remove_list(self, board: int, id: int):
+        self._forget_items(id)
+        self.connection.execute(DELETE_LIST, (board, id))
+        self.board_lists.pop(id, None)
+        if self.search_index is not None:
+            self.search_index.remove("list", id)
+
+    def _forget_items(self, board_list: int):
+        for row in self.connection.execute(SELECT_ITEM_IDS_BY_LIST, (board_list,)):
+            self.items.pop(row[0], None)
+            if self.search_index is not None:
+                self.search_index.remove("item", row[0])
+
+    def add_user(self, user: User):
+        self.connection.execute(
+            UPSERT_USER, (user.name, user.password, user.get_theme())
+        )
+        self.users[user.name] = user
+
+    def get_users(self):
+        return [self._user(row) for row in self.connection.execute(SELECT_USERS)]
+
+    def get_user(self, id: str):
+        if id in self.users:
+            return self.users[id]
+        return self._one(SELECT_USER, id, self._user)
+
+    def remove_user(self, id: str):
+        self.connection.execute(DELETE_USER, (id,))
+        self.users.pop(id, None)
+
+    def add_item(self, board_list: int, item: ItemModel):
+        self.connection.execute(
+            INSERT_ITEM,
+            (
+                item.item_id,
+                board_list,
+                item.item_text,
+                json.dumps(item.tags),
+                item.priority,
+                board_list,
+            ),
+        )
+        self.claim_id("item", item.item_id)
+        self.items[item.item_id] = item
+        if self.search_index is not None:
+            self.search_index.add_item(self.get_list(board_list).board_id, item)
+
+    def get_items(self, board_list: int):
+        return [
+            self._item(row)
+            for row in self.connection.execute(SELECT_ITEMS_BY_LIST, (board_list,))
+        ]
+
+    def iter_items(self, board_list: int):
+        # The rows are read up front so no cursor is left open on the shared
+        # connection; models for cards not already in the identity map are
+        # built per row and dropped once the caller is done with them.
+        rows = self.connection.execute(SELECT_ITEMS_BY_LIST, (board_list,)).fetchall()
+        return (self.items.get(row[0]) or self._new_item(row) for row in rows)
+
+    def get_item(self, id: int):
+        if id in self.items:
+            return self.items[id]
+        return self._one(SELECT_ITEM, id, self._item)
+
+    def get_items_by_board(self, board: int):
+        return [
+            self._item(row)
+            for row in self.connection.execute(SELECT_ITEMS_BY_BOARD, (board,))
+        ]
+
+    def update_item(self, item: ItemModel, update: dict):
+        self._update(UPDATE_ITEM, item, item.item_id, update)
+        if self.search_index is not None:
+            self.search_index.add_item(self.get_list(item.board_list_id).board_id, item)
+
+    def move_item(self, item_id: int, to_list: int, index: int):
+        with self.transaction() as connection:
+            row = connection.execute(
+                SELECT_ITEM_POSITION, (to_list, item_id, index)
+            ).fetchone()
+            if row is None:
+                position = connection.execute(
+                    SELECT_NEXT_ITEM_POSITION, (to_list,)
+                ).fetchone()[0]
+            else:
+                position = row[0]
+                connection.execute(SHIFT_ITEMS, (to_list, position))
+            connection.execute(MOVE_ITEM, (to_list, position, item_id))
+        item = self.get_item(item_id)
+        item.board_list_id = to_list
+        if self.search_index is not None:
+            self.search_index.add_item(self.get_list(to_list).board_id, item)
+
+    def remove_item(self, board_list: int, id: int):
+        self.connection.execute(DELETE_ITEM, (board_list, id))
+        self.items.pop(id, None)
+        if self.search_index is not None:
+            self.search_index.remove("item", id)
+
+    def add_many(
+        self,
+        boards: list[BoardModel],
+        lists: list[BoardListModel],
+        items: list[ItemModel],
+    ):
+        # One transaction and one prepared statement per table. The models
+        # are not kept in the identity maps, so a large import doesn't stay
+        # resident; they are loaded again from their rows when first read.
+        with self.transaction() as connection:
+            connection.executemany(INSERT_BOARD, ((b.board_id, b.name) for b in boards))
+            connection.executemany(
+                INSERT_LIST,
+                (
+                    (l.board_list_id, l.board_id, l.title, l.color, l.board_id)
+                    for l in lists
+                ),
+            )
+            connection.executemany(
+                INSERT_ITEM,
+                (
+                    (
+                        i.item_id,
+                        i.board_list_id,
+                        i.item_text,
+                        json.dumps(i.tags),
+                        i.priority,
+                        i.board_list_id,
+                    )
+                    for i in items
+                ),
+            )
+            for kind, models, id_field in (
+                ("board", boards, "board_id"),
+                ("list", lists, "board_list_id"),
+                ("item", items, "item_id"),
+            ):
+                if models:
+                    self.claim_id(kind, max(getattr(m, id_field) for m in models))
+        if boards or lists or items:
+            # Rebuilt from the rows on the next search.
+            self.search_index = None
+
+    def search(self, query: str, limit: int = 10):
+        if self.search_index is None:
+            index = SearchIndex()
+            for board_id, name in self.connection.execute(SELECT_BOARDS):
+                index.add("board", board_id, board_id, name)
+            for board_list_id, board_id, title, _ in self.connection.execute(SELECT_LISTS):
+                index.add("list", board_list_id, board_id, title)
+            for item_id, board_id, text, tags in self.connection.execute(SELECT_ITEM_DOCUMENTS):
+                index.add("item", item_id, board_id, " ".join([text, *json.loads(tags)]))
+            self.search_index = index
+        return self.search_index.search(query, limit)
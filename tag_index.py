@@ -0,0 +1,87 @@
+from typing import Iterable
+
+from models import ItemModel
+
+
+class TagIndex:
+    """Inverted index of a board's cards by tag and by priority.
+
+    Tags are normalized to lower case. Substring searches go through a
+    trigram index over the distinct tags, so a query only looks at tags that
+    share every trigram with it, and filter results are plain set operations
+    over card ids.
+    """
+
+    gram_size = 3
+
+    def __init__(self, items: Iterable[ItemModel] = ()):
+        self.cards_by_tag: dict[str, set[int]] = {}
+        self.tags_by_gram: dict[str, set[str]] = {}
+        self.cards_by_priority: dict[str, set[int]] = {}
+        self.tags_of: dict[int, set[str]] = {}
+        self.priority_of: dict[int, str] = {}
+        for item in items:
+            self.add_item(item)
+
+    def grams(self, text: str) -> set[str]:
+        n = self.gram_size
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def add_item(self, item: ItemModel):
+        self.tags_of[item.item_id] = set()
+        self.set_priority(item.item_id, item.priority)
+        for tag in item.tags:
+            self.add_tag(item.item_id, tag)
+
+    def remove_item(self, item_id: int):
+        for tag in self.tags_of.pop(item_id, ()):
+            cards = self.cards_by_tag[tag]
+            cards.discard(item_id)
+            if not cards:
+                del self.cards_by_tag[tag]
+                for gram in self.grams(tag):
+                    tags = self.tags_by_gram[gram]
+                    tags.discard(tag)
+                    if not tags:
+                        del self.tags_by_gram[gram]
+        priority = self.priority_of.pop(item_id, None)
+        if priority is not None:
+            self.cards_by_priority[priority].discard(item_id)
+
+    def add_tag(self, item_id: int, tag: str):
+        tag = tag.lower()
+        if tag not in self.cards_by_tag:
+            self.cards_by_tag[tag] = set()
+            for gram in self.grams(tag):
+                self.tags_by_gram.setdefault(gram, set()).add(tag)
+        self.cards_by_tag[tag].add(item_id)
+        self.tags_of.setdefault(item_id, set()).add(tag)
+
+    def set_priority(self, item_id: int, priority: str):
+        previous = self.priority_of.get(item_id)
+        if previous is not None:
+            self.cards_by_priority[previous].discard(item_id)
+        self.priority_of[item_id] = priority
+        self.cards_by_priority.setdefault(priority, set()).add(item_id)
+
+    def matching_tags(self, text: str) -> set[str]:
+        grams = self.grams(text)
+        if not grams:
+            return {tag for tag in self.cards_by_tag if text in tag}
+        candidates = set.intersection(
+            *(self.tags_by_gram.get(gram, set()) for gram in grams)
+        )
+        return {tag for tag in candidates if text in tag}
+
+    def query(self, text: str = "", priority: str = "all") -> set[int]:
+        """Ids of the cards with a tag containing `text` and the given priority"""
+        text = text.lower()
+        result = None
+        if text:
+            result = set()
+            for tag in self.matching_tags(text):
+                result |= self.cards_by_tag[tag]
+        if priority != "all":
+            cards = self.cards_by_priority.get(priority, set())
+            result = set(cards) if result is None else result & cards
+        return set(self.priority_of) if result is None else result
@@ -0,0 +1,137 @@
+"""A random sequence of writes for checking stores against InMemoryStore.
+
+The same writes are applied to a plain InMemoryStore and to the store under
+test; afterwards both must hold the same boards, lists, cards and users, in
+the same order.
+"""
+
+import random
+
+from memory_store import InMemoryStore
+from models import BoardModel, BoardListModel, ItemModel
+from user import User
+
+SEEDS = range(10)
+STEPS = 400
+
+
+def contents(store) -> tuple:
+    boards = []
+    for board in sorted(store.get_boards(), key = lambda b: b.board_id):
+        lists = []
+        for board_list in store.get_lists_by_board(board.board_id):
+            items = [
+                (i.item_id, i.board_list_id, i.item_text, list(i.tags), i.priority)
+                for i in store.get_items(board_list.board_list_id)
+            ]
+            lists.append((board_list.board_list_id, board_list.title, board_list.color, items))
+        boards.append((board.board_id, board.name, lists))
+    users = sorted((u.name, u.password, u.get_theme()) for u in store.get_users())
+    return boards, users
+
+
+class Workload:
+    """Random writes chosen from what the reference store currently holds.
+
+    Ids come from the store under test, as they do in the app, and the
+    reference is given the same ids explicitly.
+    """
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.used: dict[str, int] = {"board": -1, "list": -1, "item": -1}
+
+    def new_id(self, store, kind: str) -> int:
+        id = store.next_id(kind)
+        assert id > self.used[kind], f"{kind} id {id} handed out twice"
+        self.used[kind] = id
+        return id
+
+    def step(self, reference: InMemoryStore, store):
+        rng = self.rng
+        boards = reference.get_boards()
+        lists = reference.get_lists()
+        items = list(reference.items_by_id.values())
+        choices = ["add_board", "add_user"]
+        if boards:
+            choices += ["update_board", "add_list", "add_list"]
+            choices += ["remove_board"] if len(boards) > 2 else []
+        if lists:
+            choices += ["update_list", "add_item", "add_item", "add_item", "add_many"]
+            choices += ["remove_list"] if len(lists) > 3 else []
+        if items:
+            choices += ["update_item", "update_item", "move_item", "move_item", "move_item"]
+            choices += ["remove_item"]
+        op = rng.choice(choices)
+        word = f"w{rng.randrange(1000)}"
+
+        if op == "add_board":
+            id = self.new_id(store, "board")
+            reference.add_board(BoardModel(word, board_id = id))
+            store.add_board(BoardModel(word, board_id = id))
+        elif op == "update_board":
+            id = rng.choice(boards).board_id
+            reference.update_board(reference.get_board(id), {"name": word})
+            store.update_board(store.get_board(id), {"name": word})
+        elif op == "remove_board":
+            id = rng.choice(boards).board_id
+            reference.remove_board(reference.get_board(id))
+            store.remove_board(store.get_board(id))
+        elif op == "add_list":
+            board = rng.choice(boards).board_id
+            id = self.new_id(store, "list")
+            color = rng.choice(["", "red", "blue"])
+            reference.add_list(board, BoardListModel(board, word, color, board_list_id = id))
+            store.add_list(board, BoardListModel(board, word, color, board_list_id = id))
+        elif op == "update_list":
+            id = rng.choice(lists).board_list_id
+            update = rng.choice([{"title": word}, {"color": "green"}, {"title": word, "color": ""}])
+            reference.update_list(reference.get_list(id), dict(update))
+            store.update_list(store.get_list(id), dict(update))
+        elif op == "remove_list":
+            board_list = rng.choice(lists)
+            reference.remove_list(board_list.board_id, board_list.board_list_id)
+            store.remove_list(board_list.board_id, board_list.board_list_id)
+        elif op == "add_item":
+            board_list = rng.choice(lists).board_list_id
+            id = self.new_id(store, "item")
+            tags = rng.sample(["a", "b", "c"], rng.randrange(3))
+            reference.add_item(board_list, ItemModel(board_list, word, list(tags), item_id = id))
+            store.add_item(board_list, ItemModel(board_list, word, list(tags), item_id = id))
+        elif op == "add_many":
+            board_list = rng.choice(lists)
+            ids = [self.new_id(store, "item") for _ in range(rng.randrange(1, 5))]
+            for target in (reference, store):
+                target.add_many(
+                    [],
+                    [],
+                    [ItemModel(board_list.board_list_id, word, [], item_id = id) for id in ids],
+                )
+        elif op == "update_item":
+            id = rng.choice(items).item_id
+            update = rng.choice([
+                {"item_text": word},
+                {"priority": rng.choice(["high", "normal", "low"])},
+                {"tags": rng.sample(["a", "b", "c"], rng.randrange(3))},
+                {"item_text": word, "priority": "high"},
+            ])
+            reference.update_item(reference.get_item(id), dict(update))
+            store.update_item(store.get_item(id), dict(update))
+        elif op == "move_item":
+            # Favour the same few cards so back-to-back moves get coalesced.
+            id = rng.choice(items[:3] if rng.random() < 0.5 else items).item_id
+            to_list = rng.choice(lists).board_list_id
+            index = rng.randrange(len(reference.items.get(to_list, ())) + 2)
+            reference.move_item(id, to_list, index)
+            store.move_item(id, to_list, index)
+        elif op == "remove_item":
+            item = rng.choice(items)
+            reference.remove_item(item.board_list_id, item.item_id)
+            store.remove_item(item.board_list_id, item.item_id)
+        elif op == "add_user":
+            name = rng.choice(["ann", "bob", "cy"])
+            theme = rng.choice(["light", "dark"])
+            for target in (reference, store):
+                user = User(name, word)
+                user.preferences["theme"] = theme
+                target.add_user(user)
@@ -0,0 +1,93 @@
+"""Checks that a JournaledStore replays to what was written before it closed.
+
+The store is closed and reopened from its snapshot and log along the way,
+with a snapshot taken often enough that each reopen replays from one. A
+reopened store, journaled or not, must not hand out an id it used before.
+"""
+
+import random
+
+import pytest
+
+from journaled_store import JournaledStore, OperationLog
+from memory_store import InMemoryStore
+from sqlite_store import SqliteStore
+from store_workload import SEEDS, STEPS, Workload, contents
+
+REOPEN_EVERY = 150
+
+
+def journaled_memory(tmp_path):
+    def open_store():
+        log = OperationLog(str(tmp_path / "journal"))
+        # Small enough that every run replays from a snapshot plus a log.
+        log.snapshot_every = 40
+        return JournaledStore(InMemoryStore(), log)
+
+    return open_store
+
+
+def journaled_sqlite(tmp_path):
+    # The journal's inner store must start empty, so each reopen replays
+    # into a fresh database.
+    count = iter(range(1000))
+
+    def open_store():
+        log = OperationLog(str(tmp_path / "journal"))
+        log.snapshot_every = 40
+        return JournaledStore(SqliteStore(str(tmp_path / f"{next(count)}.db")), log)
+
+    return open_store
+
+
+STORES = {
+    "journaled_memory": journaled_memory,
+    "journaled_sqlite": journaled_sqlite,
+}
+
+
+def close(store):
+    store.close()
+    if isinstance(store, JournaledStore) and hasattr(store.inner, "close"):
+        store.inner.close()
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("kind", STORES)
+def test_matches_in_memory_store(kind, seed, tmp_path):
+    open_store = STORES[kind](tmp_path)
+    reference = InMemoryStore()
+    workload = Workload(random.Random(seed))
+    store = open_store()
+    for step in range(1, STEPS + 1):
+        workload.step(reference, store)
+        if step % REOPEN_EVERY == 0:
+            close(store)
+            store = open_store()
+            assert contents(store) == contents(reference)
+    assert contents(store) == contents(reference)
+    close(store)
+    store = open_store()
+    assert contents(store) == contents(reference)
+    close(store)
+
+
+def sqlite(tmp_path):
+    return lambda: SqliteStore(str(tmp_path / "trello.db"))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("kind", [*STORES, "sqlite"])
+def test_reopened_store_does_not_reuse_ids(kind, seed, tmp_path):
+    open_store = sqlite(tmp_path) if kind == "sqlite" else STORES[kind](tmp_path)
+    reference = InMemoryStore()
+    workload = Workload(random.Random(seed))
+    store = open_store()
+    for _ in range(STEPS):
+        workload.step(reference, store)
+    close(store)
+    store = open_store()
+    # Ids of records removed before the reopen are not handed out again.
+    for kind_ in ("board", "list", "item"):
+        workload.new_id(store, kind_)
+    close(store)
@@ -0,0 +1,114 @@
+"""Checks that WriteBehindStore ends up writing what it was given.
+
+Writes are flushed in small, frequent batches, so coalesced updates and
+moves are interleaved with the writes that force a flush.
+"""
+
+import random
+import sqlite3
+
+import pytest
+
+from memory_store import InMemoryStore
+from models import BoardModel, BoardListModel, ItemModel
+from shared_store import SharedStore
+from sqlite_store import SqliteStore
+from store_workload import SEEDS, STEPS, Workload, contents
+from write_behind_store import WriteBehindStore
+
+
+def open_store(tmp_path, backing: str):
+    if backing == "memory":
+        inner = InMemoryStore()
+    else:
+        inner = SqliteStore(str(tmp_path / "trello.db"))
+    return WriteBehindStore(inner, flush_interval = 0.005, max_pending = 7)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("backing", ["memory", "sqlite"])
+def test_matches_in_memory_store(backing, seed, tmp_path):
+    reference = InMemoryStore()
+    workload = Workload(random.Random(seed))
+    store = open_store(tmp_path, backing)
+    for _ in range(STEPS):
+        workload.step(reference, store)
+    assert contents(store) == contents(reference)
+    store.close()
+    if backing == "sqlite":
+        reopened = SqliteStore(str(tmp_path / "trello.db"))
+        assert contents(reopened) == contents(reference)
+        reopened.close()
+
+
+def make_board(store) -> tuple[int, int, list[int]]:
+    store.add_board(BoardModel("b", board_id = store.next_id("board")))
+    lists = [store.next_id("list") for _ in range(2)]
+    for id in lists:
+        store.add_list(0, BoardListModel(0, str(id), board_list_id = id))
+    ids = [store.next_id("item") for _ in range(3)]
+    for id in ids:
+        store.add_item(lists[0], ItemModel(lists[0], str(id), [], item_id = id))
+    return lists[0], lists[1], ids
+
+
+def test_sets_aside_a_failing_write(tmp_path):
+    write_behind = WriteBehindStore(SqliteStore(str(tmp_path / "trello.db")), flush_interval = 60)
+    store = SharedStore(write_behind)
+    board_list, other, ids = make_board(store)
+    store.move_item(ids[0], other, 0)
+    store.update_item(store.get_item(ids[1]), {"item_text": "kept"})
+    # The target list goes away underneath the queue, so the backing store
+    # rejects the move.
+    write_behind.inner.remove_list(0, other)
+    write_behind.flush()
+    assert [w[0] for w in write_behind.failed] == ["move_item"]
+    assert not write_behind.pending
+    # The card is back in the list it never left, and can still be edited.
+    item = store.get_item(ids[0])
+    assert item.board_list_id == board_list
+    store.update_item(item, {"item_text": "edited"})
+    # Later writes go through, and the rejected move left no trace.
+    store.move_item(ids[2], board_list, 0)
+    write_behind.close()
+    reopened = SqliteStore(str(tmp_path / "trello.db"))
+    assert [(i.item_id, i.item_text) for i in reopened.get_items(board_list)] == [
+        (ids[2], str(ids[2])),
+        (ids[0], "edited"),
+        (ids[1], "kept"),
+    ]
+    reopened.close()
+
+
+def reject(*args):
+    raise sqlite3.OperationalError("disk I/O error")
+
+
+def test_failed_update_is_undone_on_the_model(tmp_path, monkeypatch):
+    store = WriteBehindStore(SqliteStore(str(tmp_path / "trello.db")), flush_interval = 60)
+    board_list, other, ids = make_board(store)
+    item = store.get_item(ids[0])
+    store.update_item(item, {"item_text": "first"})
+    store.update_item(item, {"item_text": "second", "priority": "high"})
+    store.move_item(ids[0], other, 0)
+    store.move_item(ids[1], other, 0)
+    # Only the update fails; the move of the same card still goes through.
+    monkeypatch.setattr(store.inner, "update_item", reject)
+    store.flush()
+    assert [w[0] for w in store.failed] == ["update_item"]
+    assert (item.item_text, item.priority) == (str(ids[0]), "normal")
+    assert item.board_list_id == other
+    store.close()
+
+
+def test_move_to_a_missing_list_is_rejected_at_once(tmp_path):
+    # Queueing it would leave the card in a list no other call can find.
+    inner = WriteBehindStore(SqliteStore(str(tmp_path / "trello.db")), flush_interval = 60)
+    store = SharedStore(inner)
+    board_list, other, ids = make_board(store)
+    with pytest.raises(KeyError):
+        store.move_item(ids[0], other + 1, 0)
+    item = store.get_item(ids[0])
+    assert item.board_list_id == board_list
+    store.update_item(item, {"item_text": "still editable"})
+    inner.close()
@@ -0,0 +1,198 @@
+import heapq
+import logging
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+import flet as ft
+
+from metrics import encoded_size
+
+logger = logging.getLogger(__name__)
+
+# Updates larger than this are logged as they are sent.
+LARGE_UPDATE_BYTES = 64 * 1024
+
+
+@dataclass(slots = True)
+class UpdateRecord:
+    origin: str
+    targets: str
+    visited: int = 0
+    changed: int = 0
+    added: int = 0
+    removed: int = 0
+    bytes: int = 0
+
+
+@dataclass(slots = True)
+class OriginTotals:
+    updates: int = 0
+    visited: int = 0
+    changed: int = 0
+    added: int = 0
+    removed: int = 0
+    bytes: int = 0
+    max_bytes: int = 0
+    worst: list[tuple[int, int, UpdateRecord]] = field(default_factory = list)
+
+
+class UpdateAudit:
+    """Debug accounting of what each page update costs.
+
+    For every update sent through a RenderBatch it counts the controls Flet
+    walked to build the diff, the controls the diff sets, adds and removes,
+    and the serialized size of the commands. Updates are attributed to the
+    `batched` handler that caused them, or otherwise to the nearest app
+    method on the stack. This patches `Control.build_update_commands`, so it
+    is meant for debugging sessions and benchmarks, not production.
+    """
+
+    def __init__(self, worst_per_origin: int = 3):
+        self.enabled = False
+        self.worst_per_origin = worst_per_origin
+        self.totals: dict[str, OriginTotals] = {}
+        self.lock = threading.Lock()
+        self.record: ContextVar[UpdateRecord | None] = ContextVar(
+            "update_audit_record", default = None
+        )
+        self.origins: ContextVar[tuple[str, ...]] = ContextVar(
+            "update_audit_origins", default = ()
+        )
+        self.sequence = 0
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        build_update_commands = ft.Control.build_update_commands
+        current = self.record
+
+        def counted_build_update_commands(control, *args, **kwargs):
+            record = current.get()
+            if record is not None:
+                record.visited += 1
+            return build_update_commands(control, *args, **kwargs)
+
+        ft.Control.build_update_commands = counted_build_update_commands
+
+    @contextmanager
+    def origin(self, name: str):
+        """Attribute the updates sent inside the block to `name`; the
+        outermost origin in a thread or task wins"""
+        token = self.origins.set(self.origins.get() + (name,))
+        try:
+            yield
+        finally:
+            self.origins.reset(token)
+
+    @contextmanager
+    def update(self, page: ft.Page, controls: tuple):
+        self.watch(page)
+        origins = self.origins.get()
+        record = UpdateRecord(
+            origins[0] if origins else origin_from_stack(),
+            ", ".join(type(c).__name__ for c in controls) or "page",
+        )
+        token = self.record.set(record)
+        try:
+            yield
+        finally:
+            self.record.reset(token)
+            self.add(record)
+
+    def watch(self, page: ft.Page):
+        connection = getattr(page, "_Page__conn", None)
+        if connection is None or getattr(connection, "audit_watched", False):
+            return
+        send_commands = connection.send_commands
+        current = self.record
+
+        def audited_send_commands(session_id, commands):
+            record = current.get()
+            if record is not None:
+                for command in commands:
+                    if command.name == "set":
+                        record.changed += 1
+                    elif command.name == "add":
+                        record.added += len(command.commands)
+                    elif command.name == "remove":
+                        record.removed += len(command.values)
+                record.bytes += encoded_size(commands)
+            return send_commands(session_id, commands)
+
+        connection.send_commands = audited_send_commands
+        connection.audit_watched = True
+
+    def add(self, record: UpdateRecord):
+        if record.bytes > LARGE_UPDATE_BYTES:
+            logger.warning(
+                "%s sent a %d byte update (%d controls visited, %d changed)",
+                record.origin, record.bytes, record.visited, record.changed,
+            )
+        with self.lock:
+            totals = self.totals.setdefault(record.origin, OriginTotals())
+            totals.updates += 1
+            totals.visited += record.visited
+            totals.changed += record.changed
+            totals.added += record.added
+            totals.removed += record.removed
+            totals.bytes += record.bytes
+            totals.max_bytes = max(totals.max_bytes, record.bytes)
+            # The sequence number breaks ties so records are never compared.
+            self.sequence += 1
+            entry = (record.bytes, self.sequence, record)
+            if len(totals.worst) < self.worst_per_origin:
+                heapq.heappush(totals.worst, entry)
+            else:
+                heapq.heappushpop(totals.worst, entry)
+
+    def reset(self):
+        with self.lock:
+            self.totals.clear()
+
+    def report(self, limit: int = 10) -> str:
+        """The origins that sent the most bytes, with their largest updates"""
+        with self.lock:
+            offenders = sorted(
+                self.totals.items(), key = lambda kv: kv[1].bytes, reverse = True
+            )[:limit]
+            lines = [
+                f"{'origin':44} {'updates':>7} {'avg bytes':>10} {'max bytes':>10}"
+                f" {'avg visited':>11} {'avg changed':>11}"
+            ]
+            for origin, t in offenders:
+                lines.append(
+                    f"{origin:44} {t.updates:>7} {t.bytes // t.updates:>10}"
+                    f" {t.max_bytes:>10} {t.visited // t.updates:>11}"
+                    f" {(t.changed + t.added + t.removed) // t.updates:>11}"
+                )
+                for size, _, r in sorted(t.worst, reverse = True):
+                    lines.append(
+                        f"    {size:>8} bytes  visited {r.visited}, set {r.changed},"
+                        f" added {r.added}, removed {r.removed}  [{r.targets}]"
+                    )
+        return "\n".join(lines)
+
+    def print_report(self):
+        if self.totals:
+            print(self.report(), file = sys.stderr)
+
+
+def origin_from_stack() -> str:
+    """Name the innermost app method on the stack, e.g. "Board.resize" """
+    frame = sys._getframe(1)
+    while frame is not None:
+        owner = frame.f_locals.get("self")
+        if isinstance(owner, ft.Control) and not type(owner).__module__.startswith("flet"):
+            name = frame.f_code.co_name
+            for cls in type(owner).__mro__:
+                if name in vars(cls):
+                    return f"{cls.__name__}.{name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+audit = UpdateAudit()
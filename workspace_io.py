@@ -0,0 +1,334 @@
+"""Streaming import and export of whole workspaces.
+
+Two formats are supported. JSON Lines holds one record per line, with
+parents always before their children:
+
+    {"board": {"name": ..., "board_id": ...}}
+    {"list": {"board_id": ..., "title": ..., "color": ..., "board_list_id": ...}}
+    {"item": {"board_list_id": ..., "item_text": ..., "tags": [...], "priority": ..., "item_id": ...}}
+
+Trello JSON is what Trello's "Export as JSON" produces: one document per
+board with `lists`, `cards` and `labels`. Exports write a JSON array of
+board documents; imports accept either an array or a single board, and
+read the array one board at a time. Tags become labels, and priorities
+become the "priority:high" and "priority:low" labels.
+
+Imports give every record a fresh id, so a workspace can be loaded into a
+store that already has boards. Records are handed to `DataStore.add_many`
+in chunks, so the number of store round trips stays independent of the
+number of cards. JSON Lines imports hold one chunk at a time and Trello
+imports one board plus one chunk; exports read cards through
+`DataStore.iter_items`, so they don't pile up in the store's caches.
+"""
+
+import argparse
+import json
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Iterable, Iterator, TextIO
+
+from models import BoardModel, BoardListModel, ItemModel
+
+if TYPE_CHECKING:
+    from data_store import DataStore
+
+CHUNK_SIZE = 1000
+
+# Characters read at a time when splitting a Trello export into boards.
+READ_SIZE = 1 << 16
+
+PRIORITY_LABELS = {"priority:high": "high", "priority:low": "low"}
+PRIORITY_COLORS = {"high": "red", "low": "green"}
+
+# Trello spaces positions out so cards can be inserted between them.
+TRELLO_POS_STEP = 16384
+
+
+def workspace_records(store: "DataStore") -> Iterator[dict]:
+    """Yield the store's contents as JSON Lines records, parents first"""
+    for board in store.get_boards():
+        yield {"board": asdict(board)}
+        for board_list in store.get_lists_by_board(board.board_id):
+            yield {"list": asdict(board_list)}
+            for item in store.iter_items(board_list.board_list_id):
+                yield {"item": asdict(item)}
+    for user in store.get_users():
+        yield {"user": [user.name, user.password, user.get_theme()]}
+
+
+class BulkWriter:
+    """Buffers new models and writes them with `add_many` in chunks.
+
+    Ids for the new models are reserved from the store in blocks that
+    double from one id up to a chunk, so an import never skips more ids of a
+    kind than it uses.
+    """
+
+    def __init__(self, store: "DataStore", chunk_size: int = CHUNK_SIZE):
+        self.store = store
+        self.chunk_size = chunk_size
+        self.boards: list[BoardModel] = []
+        self.lists: list[BoardListModel] = []
+        self.items: list[ItemModel] = []
+        self.id_blocks: dict[str, range] = {}
+        self.reserved: dict[str, int] = {}
+        self.count = 0
+
+    def new_id(self, kind: str) -> int:
+        block = self.id_blocks.get(kind)
+        if not block:
+            size = min(self.chunk_size, max(1, self.reserved.get(kind, 0)))
+            block = self.store.reserve_ids(kind, size)
+            self.reserved[kind] = self.reserved.get(kind, 0) + size
+        self.id_blocks[kind] = block[1:]
+        return block[0]
+
+    def add(self, model):
+        if isinstance(model, BoardModel):
+            self.boards.append(model)
+        elif isinstance(model, BoardListModel):
+            self.lists.append(model)
+        else:
+            self.items.append(model)
+        self.count += 1
+        if len(self.boards) + len(self.lists) + len(self.items) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.boards or self.lists or self.items:
+            self.store.add_many(self.boards, self.lists, self.items)
+            self.boards, self.lists, self.items = [], [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.flush()
+
+
+def export_jsonl(store: "DataStore", f: TextIO):
+    for record in workspace_records(store):
+        if "user" not in record:
+            f.write(json.dumps(record, separators = (",", ":")))
+            f.write("\n")
+
+
+def import_jsonl(store: "DataStore", lines: Iterable[str]) -> int:
+    """Import JSON Lines records; returns the number of models added"""
+    board_ids: dict[int, int] = {}
+    list_ids: dict[int, int] = {}
+    with BulkWriter(store) as writer:
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "board" in record:
+                fields = record["board"]
+                board = BoardModel(fields["name"], board_id = writer.new_id("board"))
+                board_ids[fields["board_id"]] = board.board_id
+                writer.add(board)
+            elif "list" in record:
+                fields = record["list"]
+                board_list = BoardListModel(
+                    board_ids[fields["board_id"]],
+                    fields["title"],
+                    fields.get("color", ""),
+                    board_list_id = writer.new_id("list"),
+                )
+                list_ids[fields["board_list_id"]] = board_list.board_list_id
+                writer.add(board_list)
+            elif "item" in record:
+                fields = record["item"]
+                writer.add(
+                    ItemModel(
+                        list_ids[fields["board_list_id"]],
+                        fields["item_text"],
+                        fields.get("tags", []),
+                        fields.get("priority", "normal"),
+                        item_id = writer.new_id("item"),
+                    )
+                )
+    return writer.count
+
+
+def export_trello(store: "DataStore", f: TextIO):
+    f.write("[")
+    for n, board in enumerate(store.get_boards()):
+        if n:
+            f.write(",")
+        write_trello_board(store, board, f)
+    f.write("]\n")
+
+
+def write_trello_board(store: "DataStore", board: BoardModel, f: TextIO):
+    # Lists and cards are written as they are read; only the label table,
+    # which is as large as the set of distinct tags, is held until the end.
+    labels: dict[str, dict] = {}
+
+    def label(name: str, color: str | None = None) -> str:
+        if name not in labels:
+            labels[name] = {
+                "id": f"{board.board_id}-{len(labels)}",
+                "idBoard": str(board.board_id),
+                "name": name,
+                "color": color,
+            }
+        return labels[name]["id"]
+
+    board_lists = store.get_lists_by_board(board.board_id)
+    f.write(json.dumps({"id": str(board.board_id), "name": board.name, "closed": False})[:-1])
+    f.write(',"lists":[')
+    f.write(",".join(
+        json.dumps({
+            "id": str(l.board_list_id),
+            "idBoard": str(board.board_id),
+            "name": l.title,
+            "closed": False,
+            "pos": (n + 1) * TRELLO_POS_STEP,
+        })
+        for n, l in enumerate(board_lists)
+    ))
+    f.write('],"cards":[')
+    first = True
+    for board_list in board_lists:
+        for n, item in enumerate(store.iter_items(board_list.board_list_id)):
+            id_labels = [label(tag) for tag in item.tags]
+            if item.priority in PRIORITY_COLORS:
+                id_labels.append(
+                    label(f"priority:{item.priority}", PRIORITY_COLORS[item.priority])
+                )
+            if not first:
+                f.write(",")
+            first = False
+            f.write(json.dumps({
+                "id": str(item.item_id),
+                "idBoard": str(board.board_id),
+                "idList": str(board_list.board_list_id),
+                "name": item.item_text,
+                "closed": False,
+                "pos": (n + 1) * TRELLO_POS_STEP,
+                "idLabels": id_labels,
+            }))
+    f.write('],"labels":')
+    f.write(json.dumps(list(labels.values())))
+    f.write("}")
+
+
+def import_trello(store: "DataStore", f: TextIO) -> int:
+    """Import Trello JSON boards; returns the number of models added"""
+    with BulkWriter(store) as writer:
+        for document in read_documents(f):
+            add_trello_board(writer, document)
+    return writer.count
+
+
+def read_documents(f: TextIO, read_size: int = READ_SIZE) -> Iterator[dict]:
+    """Yield the elements of a top-level JSON array one at a time, or the
+    document itself if it isn't an array.
+
+    The standard library has no incremental parser, so each element is
+    parsed whole with `raw_decode` once enough of it has been read; memory
+    is bounded by the largest board, not the file.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(read_size).lstrip()
+    in_array = buffer.startswith("[")
+    if in_array:
+        buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip()
+        if in_array and buffer.startswith(","):
+            buffer = buffer[1:]
+            continue
+        if in_array and buffer.startswith("]"):
+            return
+        try:
+            if not buffer:
+                raise json.JSONDecodeError("Expecting value", buffer, 0)
+            document, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            # Most likely the element runs past what has been read. Reading
+            # at least as much again as is buffered keeps re-parsing a large
+            # board linear in its size.
+            more = f.read(max(read_size, len(buffer)))
+            if not more:
+                raise
+            buffer += more
+            continue
+        yield document
+        if not in_array:
+            return
+        buffer = buffer[end:]
+
+
+def add_trello_board(writer: BulkWriter, document: dict):
+    board = BoardModel(document.get("name", ""), board_id = writer.new_id("board"))
+    writer.add(board)
+    label_names = {
+        l["id"]: l.get("name") or l.get("color") or ""
+        for l in document.get("labels", [])
+    }
+    list_ids: dict[str, int] = {}
+    lists = [l for l in document.get("lists", []) if not l.get("closed")]
+    for l in sorted(lists, key = lambda l: l.get("pos", 0)):
+        board_list = BoardListModel(
+            board.board_id, l.get("name", ""), board_list_id = writer.new_id("list")
+        )
+        list_ids[l["id"]] = board_list.board_list_id
+        writer.add(board_list)
+    cards = [
+        c for c in document.get("cards", [])
+        if not c.get("closed") and c.get("idList") in list_ids
+    ]
+    for card in sorted(cards, key = lambda c: (list_ids[c["idList"]], c.get("pos", 0))):
+        names = [
+            l.get("name") or l.get("color") or "" for l in card.get("labels", [])
+        ] or [label_names.get(id, "") for id in card.get("idLabels", [])]
+        priority = "normal"
+        tags = []
+        for name in names:
+            if name in PRIORITY_LABELS:
+                priority = PRIORITY_LABELS[name]
+            elif name and name not in tags:
+                tags.append(name)
+        writer.add(
+            ItemModel(
+                list_ids[card["idList"]],
+                card.get("name", ""),
+                tags,
+                priority,
+                item_id = writer.new_id("item"),
+            )
+        )
+
+
+def main():
+    from sqlite_store import SqliteStore
+
+    parser = argparse.ArgumentParser(description = "Import or export a workspace")
+    parser.add_argument("action", choices = ["import", "export"])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices = ["jsonl", "trello"], default = "jsonl")
+    parser.add_argument("--db", default = "trello.db")
+    args = parser.parse_args()
+    store = SqliteStore(args.db)
+    try:
+        if args.action == "export":
+            with open(args.path, "w", encoding = "utf-8") as f:
+                if args.format == "jsonl":
+                    export_jsonl(store, f)
+                else:
+                    export_trello(store, f)
+        else:
+            with open(args.path, encoding = "utf-8") as f:
+                if args.format == "jsonl":
+                    count = import_jsonl(store, f)
+                else:
+                    count = import_trello(store, f)
+            print(f"imported {count} records")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import logging
+import threading
+from collections import deque
+from contextlib import nullcontext
+
+from data_store import DataStore, DelegatingStore
+from models import BoardModel, BoardListModel, ItemModel
+from user import User
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindStore(DelegatingStore):
+    """Buffers updates and moves and writes them to `inner` in batches.
+
+    Updates are applied to the model at once, so reads stay current, and
+    the write is queued; a later update of the same board, list or card is
+    merged into the queued one. Repeated moves of one card collapse into the
+    last. The queue is written in a single transaction every
+    `flush_interval` seconds, once it holds `max_pending` writes, and on
+    `close()`. Any other write, and any read of cards, writes the queue
+    first so the backing store applies everything in order. A queued write
+    that fails is logged and set aside in `failed` rather than retried, so
+    it can't hold up the writes after it, and the model gets back the
+    values it had before that write.
+    """
+
+    def __init__(
+        self,
+        inner: DataStore,
+        flush_interval: float = 1.0,
+        max_pending: int = 200,
+    ):
+        super().__init__(inner)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # [method name, *args] in call order; queued update dicts, with the
+        # values they replaced, are also indexed by entity so later updates
+        # can be merged into them.
+        self.pending: list[list] = []
+        self.pending_updates: dict[tuple[str, int], tuple[dict, dict]] = {}
+        # Per pending write, the model it changed and the values it replaced.
+        self.undo: list[tuple[object, dict]] = []
+        self.failed: deque[list] = deque(maxlen = 100)
+        self.lock = threading.RLock()
+        self.wake = threading.Event()
+        self.closed = False
+        self.flusher = threading.Thread(target = self.run_flusher, daemon = True)
+        self.flusher.start()
+
+    def run_flusher(self):
+        while not self.closed:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # The batch couldn't be committed; it is kept and retried.
+                logger.exception("write-behind flush failed")
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            # Stores that can group writes (SqliteStore) commit the batch
+            # at once, and undo only the write that fails.
+            transaction = getattr(self.inner, "transaction", nullcontext)
+            written = []
+            with transaction():
+                for write in self.pending:
+                    try:
+                        with transaction():
+                            getattr(self.inner, write[0])(*write[1:])
+                        written.append(True)
+                    except Exception:
+                        # It would fail the same way on every retry.
+                        logger.exception("write-behind dropped %s", write[0])
+                        self.failed.append(write)
+                        written.append(False)
+            self.restore(written)
+            self.pending = []
+            self.pending_updates = {}
+            self.undo = []
+
+    def restore(self, written: list[bool]):
+        # Walking back from the last write, a value is put back for each
+        # write that failed unless a later write of the same field went
+        # through.
+        settled = set()
+        for ok, (model, originals) in zip(reversed(written), reversed(self.undo)):
+            for k, value in originals.items():
+                if ok:
+                    settled.add((id(model), k))
+                elif (id(model), k) not in settled:
+                    setattr(model, k, value)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.flush()
+        self.wake.set()
+        if hasattr(self.inner, "close"):
+            self.inner.close()
+
+    def queue(self, write: list, model, originals: dict):
+        self.pending.append(write)
+        self.undo.append((model, originals))
+        if len(self.pending) >= self.max_pending:
+            self.wake.set()
+
+    def queue_update(self, name: str, kind: str, id: int, model, update: dict):
+        queued, originals = self.pending_updates.get((kind, id), (None, {}))
+        for k in update:
+            originals.setdefault(k, getattr(model, k))
+            setattr(model, k, update[k])
+        if queued is not None:
+            queued.update(update)
+        else:
+            queued = dict(update)
+            self.pending_updates[(kind, id)] = (queued, originals)
+            self.queue([name, model, queued], model, originals)
+
+    def add_board(self, board: BoardModel):
+        with self.lock:
+            self.flush()
+            self.inner.add_board(board)
+
+    def get_board(self, id: int):
+        with self.lock:
+            return self.inner.get_board(id)
+
+    def get_boards(self):
+        with self.lock:
+            return self.inner.get_boards()
+
+    def update_board(self, board: BoardModel, update: dict):
+        with self.lock:
+            self.queue_update("update_board", "board", board.board_id, board, update)
+
+    def remove_board(self, board: BoardModel):
+        with self.lock:
+            self.flush()
+            self.inner.remove_board(board)
+
+    def add_user(self, user: User):
+        with self.lock:
+            self.flush()
+            self.inner.add_user(user)
+
+    def get_users(self):
+        with self.lock:
+            return self.inner.get_users()
+
+    def get_user(self, id: str):
+        with self.lock:
+            return self.inner.get_user(id)
+
+    def remove_user(self, id: str):
+        with self.lock:
+            self.flush()
+            self.inner.remove_user(id)
+
+    def add_list(self, board: int, list: BoardListModel):
+        with self.lock:
+            self.flush()
+            self.inner.add_list(board, list)
+
+    def get_lists(self):
+        with self.lock:
+            return self.inner.get_lists()
+
+    def get_list(self, id: int):
+        with self.lock:
+            return self.inner.get_list(id)
+
+    def get_lists_by_board(self, board: int):
+        with self.lock:
+            return self.inner.get_lists_by_board(board)
+
+    def update_list(self, list: BoardListModel, update: dict):
+        with self.lock:
+            self.queue_update("update_list", "list", list.board_list_id, list, update)
+
+    def remove_list(self, board: int, id: int):
+        with self.lock:
+            self.flush()
+            self.inner.remove_list(board, id)
+
+    def add_item(self, board_list: int, item: ItemModel):
+        with self.lock:
+            self.flush()
+            self.inner.add_item(board_list, item)
+
+    def get_items(self, board_list: int):
+        with self.lock:
+            self.flush()
+            return self.inner.get_items(board_list)
+
+    def iter_items(self, board_list: int):
+        with self.lock:
+            self.flush()
+            return self.inner.iter_items(board_list)
+
+    def get_item(self, id: int):
+        with self.lock:
+            return self.inner.get_item(id)
+
+    def get_items_by_board(self, board: int):
+        with self.lock:
+            self.flush()
+            return self.inner.get_items_by_board(board)
+
+    def update_item(self, item: ItemModel, update: dict):
+        with self.lock:
+            self.queue_update("update_item", "item", item.item_id, item, update)
+
+    def move_item(self, item_id: int, to_list: int, index: int):
+        with self.lock:
+            item = self.inner.get_item(item_id)
+            # Rejected now rather than at the flush, after the card has
+            # been shown in a list that doesn't exist.
+            self.inner.get_list(to_list)
+            # A move's result depends only on where the other cards are, so
+            # back-to-back moves of the same card leave it where the last
+            # one puts it.
+            if self.pending and self.pending[-1][:2] == ["move_item", item_id]:
+                # The first move's undo still holds where the card started.
+                self.pending[-1] = ["move_item", item_id, to_list, index]
+            else:
+                self.queue(
+                    ["move_item", item_id, to_list, index],
+                    item,
+                    {"board_list_id": item.board_list_id},
+                )
+            item.board_list_id = to_list
+
+    def remove_item(self, board_list: int, id: int):
+        with self.lock:
+            self.flush()
+            self.inner.remove_item(board_list, id)
+
+    def add_many(
+        self,
+        boards: list[BoardModel],
+        lists: list[BoardListModel],
+        items: list[ItemModel],
+    ):
+        with self.lock:
+            self.flush()
+            self.inner.add_many(boards, lists, items)
+
+    def next_id(self, kind: str):
+        with self.lock:
+            return self.inner.next_id(kind)
+
+    def reserve_ids(self, kind: str, count: int):
+        with self.lock:
+            return self.inner.reserve_ids(kind, count)
+
+    def search(self, query: str, limit: int = 10):
+        with self.lock:
+            self.flush()
+            return self.inner.search(query, limit)